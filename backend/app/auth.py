@@ -1,26 +1,44 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+import hashlib
+import time
+import uuid
 import jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import exists
 
 from database.db_connect import SessionLocal
 from database.models import User
+from common.cache import LocalCache
+from common.config import redis_client, logger
+from common.monitoring import AUTH_DURATION
+from common.passwords import hash_password, verify_password
 from common.settings import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+REVOKED_KEY_PREFIX = "auth:revoked:"
+
 auth_router = APIRouter()
 
+# Verified tokens by hash; entries never outlive the token's own expiry.
+token_cache = LocalCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL, tier="auth")
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+    email: str
+
 
 def get_db():
     db = SessionLocal()
@@ -30,21 +48,13 @@ def get_db():
         db.close()
 
 
-def hash_password(password: str):
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -53,52 +63,143 @@ class UserRegister(BaseModel):
     email: EmailStr
     password: str
 
+
+def user_exists(db: Session, username: str, email: str) -> bool:
+    return db.query(exists().where((User.username == username) | (User.email == email))).scalar()
+
+
+def add_user(db: Session, user: User):
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+
+def find_user(db: Session, username: str):
+    return db.query(User).filter(User.username == username).first()
+
+
+def update_password_hash(db: Session, user: User, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
+
+
+# Hashing runs on the dedicated process pool in common.passwords; only the
+# short database calls use the request threadpool.
 @auth_router.post("/register", status_code=status.HTTP_201_CREATED)
-def register_user(user: UserRegister, db: Session = Depends(get_db)):
-    existing_user = db.query(exists().where((User.username == user.username) | (User.email == user.email))).scalar()
-    if existing_user:
+async def register_user(user: UserRegister, db: Session = Depends(get_db)):
+    if await run_in_threadpool(user_exists, db, user.username, user.email):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User already exists")
 
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password(user.password)
     new_user = User(username=user.username, email=user.email, hashed_password=hashed_password)
-
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(add_user, db, new_user)
 
     return {"message": "User created successfully"}
 
 
 @auth_router.post("/login")
-def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(find_user, db, form_data.username)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
+
+    valid, new_hash = await verify_password(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
+    if new_hash:
+        await run_in_threadpool(update_password_hash, db, user, new_hash)
 
-    access_token = create_access_token({"sub": user.username})
+    access_token = create_access_token({"sub": user.username, "uid": user.id, "email": user.email})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid authentication",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except jwt.PyJWTError:
-        raise credentials_exception
+        raise credentials_exception()
+    if payload.get("sub") is None:
+        raise credentials_exception()
+    return payload
+
 
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise credentials_exception
-    return user
+def load_principal(username: str):
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.username == username).first()
+        return Principal(user.id, user.username, user.email) if user else None
+
+
+async def is_revoked(jti: str | None) -> bool:
+    """One Redis EXISTS per request; if Redis is unreachable the token is
+    accepted, as a cache outage must not log every user out."""
+    if jti is None:
+        return False
+    try:
+        return bool(await redis_client.exists(REVOKED_KEY_PREFIX + jti))
+    except Exception as e:
+        logger.error(f"Could not check token revocation: {e}")
+        return False
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    """Resolve the bearer token to a Principal.
+
+    Tokens carry the user's id and email as claims, so only tokens issued
+    before those claims existed need a database lookup. Verified tokens are
+    cached per worker, keyed by their hash, until they expire or
+    AUTH_CACHE_TTL passes; revocation is checked on every request.
+    """
+    start = time.perf_counter()
+    key = token_key(token)
+    hit, entry = token_cache.get(key)
+    if hit:
+        principal, jti = entry
+        source = "cache"
+    else:
+        payload = decode_token(token)
+        if "uid" in payload and "email" in payload:
+            principal = Principal(payload["uid"], payload["sub"], payload["email"])
+            source = "claims"
+        else:
+            principal = await run_in_threadpool(load_principal, payload["sub"])
+            if principal is None:
+                raise credentials_exception()
+            source = "database"
+        jti = payload.get("jti")
+        remaining = int(payload["exp"] - time.time())
+        if remaining > 0:
+            token_cache.set(key, (principal, jti), ttl=remaining)
+
+    if await is_revoked(jti):
+        token_cache.delete(key)
+        raise credentials_exception()
+    AUTH_DURATION.labels(source=source).observe(time.perf_counter() - start)
+    return principal
+
+
+@auth_router.post("/logout")
+async def logout_user(token: str = Depends(oauth2_scheme)):
+    payload = decode_token(token)
+    token_cache.delete(token_key(token))
+    jti = payload.get("jti")
+    remaining = int(payload["exp"] - time.time())
+    if jti is not None and remaining > 0:
+        await redis_client.set(REVOKED_KEY_PREFIX + jti, 1, ex=remaining)
+    return {"message": "Logged out"}
 
 
 @auth_router.get("/users/me")
-def get_logged_in_user(current_user: User = Depends(get_current_user)):
+async def get_logged_in_user(current_user: Principal = Depends(get_current_user)):
     return {"username": current_user.username, "email": current_user.email}
@@ -0,0 +1,60 @@
+"""Measure authentication overhead per request.
+
+``legacy`` decodes the JWT and loads the user with a fresh session, as
+get_current_user did before; ``cached`` runs the current get_current_user,
+which mostly hits the token cache plus one Redis EXISTS for revocation.
+Needs the database (with the user) and Redis from the environment.
+
+    PYTHONPATH=. python benchmarks/bench_auth.py --username alice --requests 5000
+"""
+import argparse
+import asyncio
+import time
+
+from auth import create_access_token, decode_token, get_current_user, load_principal, token_cache
+from database.db_connect import SessionLocal
+from database.models import User
+
+
+def legacy_auth(token: str):
+    payload = decode_token(token)
+    with SessionLocal() as db:
+        return db.query(User).filter(User.username == payload["sub"]).first()
+
+
+def report(name: str, latencies: list):
+    latencies.sort()
+    mean = sum(latencies) / len(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:>7}: mean={mean * 1e6:8.1f}us  p99={p99 * 1e6:8.1f}us")
+
+
+async def main(username: str, requests: int):
+    principal = load_principal(username)
+    if principal is None:
+        raise SystemExit(f"User {username!r} does not exist")
+    legacy_token = create_access_token({"sub": username})
+    token = create_access_token({"sub": username, "uid": principal.id, "email": principal.email})
+
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        legacy_auth(legacy_token)
+        latencies.append(time.perf_counter() - start)
+    report("legacy", latencies)
+
+    token_cache.clear()
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await get_current_user(token)
+        latencies.append(time.perf_counter() - start)
+    report("cached", latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.username, args.requests))
@@ -0,0 +1,82 @@
+"""Compare cache codecs on synthetic coronavirus-shaped result sets.
+
+Reports encode/decode time and bytes per entry for the original JSON path
+(json.dumps with CustomJSONEncoder, no header) and every codec/compression
+combination available in this environment. Needs no database or Redis.
+
+    PYTHONPATH=. python benchmarks/bench_cache_codec.py --rows 1000,10000,100000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from common import codec
+from common.utils import CustomJSONEncoder
+
+
+def make_rows(count: int):
+    start = date(2020, 1, 22)
+    types = ["confirmed", "death", "recovery"]
+    return [
+        {
+            "date": (start + timedelta(days=i // 3)).isoformat(),
+            "type": types[i % 3],
+            "cases": random.randint(0, 50000),
+            "country": random.choice(["Germany", "France", "Italy", "Spain", "Canada"]),
+            "lat": round(random.uniform(-60, 60), 4),
+            "long": round(random.uniform(-180, 180), 4),
+        }
+        for i in range(count)
+    ]
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    variants = [(
+        "json (legacy)",
+        lambda rows, frame: json.dumps(rows, cls=CustomJSONEncoder).encode(),
+        json.loads,
+    )]
+    for codec_name in codec.CODECS:
+        for compression_name in codec.COMPRESSIONS:
+            try:
+                codec.encode(pd.DataFrame({"a": [1] * 1000}), codec_name, compression_name)
+            except codec.CodecError:
+                continue
+            variants.append((
+                f"{codec_name}+{compression_name}",
+                lambda rows, frame, c=codec_name, z=compression_name: codec.encode(frame, c, z),
+                codec.decode,
+            ))
+
+    for count in (int(n) for n in args.rows.split(",")):
+        rows = make_rows(count)
+        frame = pd.DataFrame(rows)
+        print(f"\n{count} rows")
+        print(f"{'variant':<20}{'encode ms':>12}{'decode ms':>12}{'bytes':>14}")
+        for name, encode, decode in variants:
+            encode_time, payload = timed(lambda: encode(rows, frame), args.repeat)
+            decode_time, _ = timed(lambda: decode(payload), args.repeat)
+            print(f"{name:<20}{encode_time * 1000:>12.2f}{decode_time * 1000:>12.2f}{len(payload):>14,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare row-wise and vectorized cleaning + serialization of query results.
+
+The row-wise path is the original ``clean_data`` followed by ``json.dumps``
+with ``CustomJSONEncoder``; the vectorized path builds a frame from the raw
+rows, runs ``clean_frame`` and serializes with ``DataFrame.to_json``. Rows
+mimic what the driver returns for a coronavirus table (``date`` objects,
+floats with the occasional inf/NaN). Needs no database.
+
+    PYTHONPATH=. python benchmarks/bench_clean_data.py --rows 10000,100000,1000000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from common.utils import CustomJSONEncoder, clean_data, clean_frame, frame_from_rows, frame_to_json
+
+COLUMNS = ["id", "date", "province", "country", "lat", "long", "type", "cases"]
+
+
+def make_rows(count: int):
+    start = date(2020, 1, 22)
+    types = ["confirmed", "death", "recovery"]
+    countries = ["Germany", "France", "Italy", "Spain", "Canada"]
+    specials = [float("inf"), float("-inf"), float("nan")]
+    return [
+        (
+            i,
+            start + timedelta(days=i % 1400),
+            None,
+            random.choice(countries),
+            random.choice(specials) if i % 997 == 0 else round(random.uniform(-60, 60), 4),
+            round(random.uniform(-180, 180), 4),
+            types[i % 3],
+            random.randint(0, 50000),
+        )
+        for i in range(count)
+    ]
+
+
+def row_wise(rows):
+    data = clean_data([dict(zip(COLUMNS, row)) for row in rows])
+    return json.dumps(data, cls=CustomJSONEncoder).encode()
+
+
+def vectorized(rows):
+    return frame_to_json(clean_frame(frame_from_rows(COLUMNS, rows)))
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'row-wise ms':>14}{'vectorized ms':>16}{'speedup':>10}")
+    for count in (int(n) for n in args.rows.split(",")):
+        rows = make_rows(count)
+        row_time, expected = timed(lambda: row_wise(rows), args.repeat)
+        vector_time, actual = timed(lambda: vectorized(rows), args.repeat)
+        if json.loads(expected) != json.loads(actual):
+            raise SystemExit(f"Outputs differ for {count} rows")
+        print(f"{count:>10,}{row_time * 1000:>14.1f}{vector_time * 1000:>16.1f}{row_time / vector_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare the blocking and asyncio query paths under concurrent load.
+
+The sync path mimics the FastAPI threadpool (40 workers) running psycopg2
+through ``query_db``; the async path runs ``query_db_async`` on one event loop.
+
+    PYTHONPATH=. python benchmarks/bench_data_path.py --requests 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database.async_db import query_db_async, close_async_pool
+from database.db_connect import query_db, close_pool
+
+QUERY = """
+    SELECT date, type, SUM(cases) AS cases
+    FROM public.coronavirus_2021
+    WHERE lower(country) = lower(%s)
+    GROUP BY date, type
+    ORDER BY date;
+"""
+
+
+def report(name: str, latencies: list, elapsed: float):
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:>5}: {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50={p50 * 1000:7.1f}ms  p99={p99 * 1000:7.1f}ms"
+    )
+
+
+async def run_sync(requests: int, concurrency: int, params: tuple):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    def timed_query():
+        start = time.perf_counter()
+        query_db(QUERY, params)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=40) as executor:
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                await loop.run_in_executor(executor, timed_query)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        report("sync", latencies, time.perf_counter() - start)
+
+
+async def run_async(requests: int, concurrency: int, params: tuple):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await query_db_async(QUERY, params)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    report("async", latencies, time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--country", default="Germany")
+    args = parser.parse_args()
+
+    params = (args.country,)
+    try:
+        await run_sync(args.requests, args.concurrency, params)
+        await run_async(args.requests, args.concurrency, params)
+    finally:
+        close_pool()
+        await close_async_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
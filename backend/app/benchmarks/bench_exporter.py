@@ -0,0 +1,122 @@
+"""Refresh time and peak RSS of the metrics exporter, legacy vs incremental.
+
+Generates synthetic coronavirus_*.csv and covid19_vaccine.csv files shaped
+like the real ones, then runs each scenario in a fresh process:
+
+  legacy   original update_metrics (read all CSVs, iterrows into Gauges)
+  cold     CovidCollector.refresh with an empty aggregate cache
+  restart  a new process whose Parquet aggregate cache is already populated
+  steady   second refresh in the same process with no file changes
+  touched  second refresh after one of the yearly files changed
+
+    PYTHONPATH=. python benchmarks/bench_exporter.py --rows-per-file 1000000
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+SCENARIO = r'''
+import os, resource, sys, time
+sys.path.insert(0, "covid_metrics_exporter")
+mode, data_dir, cache_dir = sys.argv[1:4]
+os.environ["COVID_DATA_DIR"] = data_dir
+os.environ["COVID_CACHE_DIR"] = cache_dir
+
+if mode == "legacy":
+    import glob
+    import pandas as pd
+    from prometheus_client import Gauge
+    cases_metric = Gauge("covid_cases_total", "", ["country", "lat", "lon"])
+    deaths_metric = Gauge("covid_deaths_total", "", ["country", "lat", "lon"])
+    vaccinated_metric = Gauge("covid_vaccinated_total", "", ["country", "lat", "lon"])
+
+    def run():
+        frames = [pd.read_csv(f, low_memory=False, usecols=["country", "lat", "long", "type", "cases"])
+                  for f in glob.glob(os.path.join(data_dir, "coronavirus_*.csv"))]
+        df_all = pd.concat(frames).dropna(subset=["country", "lat", "long", "type", "cases"])
+        for kind, metric in (("confirmed", cases_metric), ("death", deaths_metric)):
+            grouped = df_all[df_all["type"] == kind].groupby(["country", "lat", "long"])["cases"].sum().reset_index()
+            for _, row in grouped.iterrows():
+                metric.labels(country=row["country"], lat=str(float(row["lat"])), lon=str(float(row["long"]))).set(row["cases"])
+        df = pd.read_csv(os.path.join(data_dir, "covid19_vaccine.csv"),
+                         usecols=["country_region", "lat", "long", "people_at_least_one_dose"]).dropna()
+        grouped = df.groupby(["country_region", "lat", "long"])["people_at_least_one_dose"].max().reset_index()
+        for _, row in grouped.iterrows():
+            vaccinated_metric.labels(country=row["country_region"], lat=str(float(row["lat"])), lon=str(float(row["long"]))).set(row["people_at_least_one_dose"])
+else:
+    from exporter import CovidCollector
+    collector = CovidCollector(data_dir, cache_dir)
+    if mode in ("steady", "touched"):
+        collector.refresh()
+        if mode == "touched":
+            path = os.path.join(data_dir, "coronavirus_2023.csv")
+            with open(path, "a") as f:
+                f.write("")
+            os.utime(path)
+    run = collector.refresh
+
+start = time.perf_counter()
+run()
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def write_data(data_dir: str, rows_per_file: int):
+    rng = np.random.default_rng(0)
+    places = pd.DataFrame({
+        "country": [f"Country {i}" for i in range(280)],
+        "lat": rng.uniform(-60, 60, 280).round(4),
+        "long": rng.uniform(-180, 180, 280).round(4),
+    })
+    for year in (2020, 2021, 2022, 2023):
+        index = rng.integers(0, len(places), rows_per_file)
+        df = places.iloc[index].reset_index(drop=True)
+        df.insert(0, "date", pd.Timestamp(f"{year}-01-01") + pd.to_timedelta(rng.integers(0, 365, rows_per_file), "D"))
+        df.insert(1, "province", None)
+        df["type"] = rng.choice(["confirmed", "death", "recovery"], rows_per_file)
+        df["cases"] = rng.integers(0, 5000, rows_per_file)
+        df["iso3"] = "XXX"
+        df.to_csv(os.path.join(data_dir, f"coronavirus_{year}.csv"), index=False)
+
+    rows = rows_per_file // 4
+    index = rng.integers(0, len(places), rows)
+    vaccine = places.iloc[index].reset_index(drop=True).rename(columns={"country": "country_region"})
+    vaccine["people_at_least_one_dose"] = rng.integers(0, 10_000_000, rows)
+    vaccine["doses_admin"] = rng.integers(0, 10_000_000, rows)
+    vaccine.to_csv(os.path.join(data_dir, "covid19_vaccine.csv"), index=False)
+
+
+def scenario(mode: str, data_dir: str, cache_dir: str):
+    output = subprocess.run(
+        [sys.executable, "-c", SCENARIO, mode, data_dir, cache_dir],
+        check=True, capture_output=True, text=True,
+    ).stdout.split()
+    return float(output[-2]), int(output[-1]) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows-per-file", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir, tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        write_data(data_dir, args.rows_per_file)
+        print(f"Generated {4 * args.rows_per_file:,} case rows in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'scenario':<10}{'refresh s':>12}{'max RSS MiB':>14}")
+        for mode in ("legacy", "cold", "restart", "steady", "touched"):
+            seconds, rss = scenario(mode, data_dir, cache_dir)
+            print(f"{mode:<10}{seconds:>12.2f}{rss:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Compare pyplot-in-threadpool rendering with the pooled plot renderer.
+
+The legacy path is the original ``generate_plot`` (global pyplot state,
+per-element date parsing) run on a 40-thread pool like FastAPI's; the pooled
+path is ``plot_series`` + ``render_plot`` on the process pool. Needs no
+database.
+
+    PYTHONPATH=. python benchmarks/bench_plot_render.py --renders 64 --concurrency 1,8,32
+"""
+import argparse
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from common.plotting import plot_series, render_plot, get_executor, shutdown_executor
+
+
+def legacy_generate_plot(dates, values, column_name):
+    parsed_dates = []
+    for d in dates:
+        try:
+            parsed_dates.append(pd.to_datetime(d))
+        except Exception:
+            continue
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(parsed_dates, values[:len(parsed_dates)], marker='o', linestyle='-', linewidth=2)
+    plt.xlabel("Date")
+    plt.ylabel(column_name.replace("_", " ").title())
+    plt.title(f"{column_name.replace('_', ' ').title()} Over Time")
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+
+    ax = plt.gca()
+    ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+
+    buf = io.BytesIO()
+    plt.savefig(buf, format="png")
+    plt.close()
+    return buf.getvalue()
+
+
+def make_frame(points: int) -> pd.DataFrame:
+    dates = pd.date_range("2021-01-01", periods=points, freq="D")
+    return pd.DataFrame({
+        "date": dates.strftime("%Y-%m-%d"),
+        "cases": np.cumsum(np.random.randint(0, 5000, size=points)),
+    })
+
+
+async def run(render, renders: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await render()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(renders)))
+    return renders / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--renders", type=int, default=64)
+    parser.add_argument("--points", type=int, default=365)
+    parser.add_argument("--concurrency", default="1,8,32")
+    args = parser.parse_args()
+
+    df = make_frame(args.points)
+    loop = asyncio.get_running_loop()
+    threads = ThreadPoolExecutor(max_workers=40)
+
+    async def legacy():
+        dates, values = df["date"].tolist(), df["cases"].tolist()
+        await loop.run_in_executor(threads, legacy_generate_plot, dates, values, "cases")
+
+    async def pooled():
+        dates, values = plot_series(df["date"], df["cases"])
+        await render_plot(dates, values, "cases")
+
+    # Start the worker processes and build their templates before timing.
+    workers = get_executor()._max_workers
+    await asyncio.gather(*(pooled() for _ in range(workers * 2)))
+
+    print(f"{'concurrency':>12}{'legacy renders/s':>18}{'pooled renders/s':>18}")
+    for concurrency in (int(n) for n in args.concurrency.split(",")):
+        legacy_rate = await run(legacy, args.renders, concurrency)
+        pooled_rate = await run(pooled, args.renders, concurrency)
+        print(f"{concurrency:>12}{legacy_rate:>18.1f}{pooled_rate:>18.1f}")
+
+    threads.shutdown()
+    shutdown_executor()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
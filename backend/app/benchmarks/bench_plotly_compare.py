@@ -0,0 +1,74 @@
+"""Response size and latency of /plotly/compare_types, before and after.
+
+"legacy" is the original handler body: boolean mask per type and
+``to_html(full_html=True)`` with plotly.js inlined. "cold" builds the figure
+spec with one groupby and wraps it in the CDN page; "warm" only wraps an
+already cached spec, and "json" is the cached spec returned as-is. Needs no
+database.
+
+    PYTHONPATH=. python benchmarks/bench_plotly_compare.py --days 365
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+from common.plotting import plotly_page
+from main import build_compare_types_figure, compare_types_title
+
+
+def legacy_render(df: pd.DataFrame, title: str) -> str:
+    df = df.assign(date=pd.to_datetime(df["date"]))
+    fig = go.Figure()
+    for t in df["type"].unique():
+        subset = df[df["type"] == t]
+        fig.add_trace(go.Scatter(x=subset["date"], y=subset["cases"], mode="lines+markers", name=t))
+    fig.update_layout(title=title, xaxis_title="Date", yaxis_title="Cases", hovermode="x unified")
+    return fig.to_html(full_html=True)
+
+
+def make_frame(days: int) -> pd.DataFrame:
+    dates = pd.date_range("2021-01-01", periods=days, freq="D").strftime("%Y-%m-%d")
+    return pd.DataFrame({
+        "date": np.repeat(dates, 3),
+        "type": ["confirmed", "death", "recovery"] * days,
+        "cases": np.random.randint(0, 500000, size=days * 3),
+    })
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    df = make_frame(args.days)
+    title = compare_types_title("2021", "Germany")
+    figure_json = build_compare_types_figure(df, title)
+
+    variants = [
+        ("legacy", lambda: legacy_render(df, title).encode()),
+        ("cold", lambda: plotly_page(build_compare_types_figure(df, title), title).encode()),
+        ("warm", lambda: plotly_page(figure_json, title).encode()),
+        ("json", lambda: figure_json),
+    ]
+    print(f"{'variant':<10}{'ms':>10}{'bytes':>14}")
+    for name, fn in variants:
+        seconds, body = timed(fn, args.repeat)
+        print(f"{name:<10}{seconds * 1000:>10.2f}{len(body):>14,}")
+
+
+if __name__ == "__main__":
+    main()
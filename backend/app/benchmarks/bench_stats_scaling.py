@@ -0,0 +1,111 @@
+"""Measure stats service throughput as the number of replicas grows.
+
+Starts 1..N stats_service replicas against a local nats-server (all in the
+same queue group), fires a fixed number of CFR requests at each size and
+prints req/s and latency percentiles.
+
+    nats-server &
+    PYTHONPATH=. python benchmarks/bench_stats_scaling.py --replicas 1,2,4 --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from nats.aio.client import Client as NATS
+
+SERVICE = os.path.join(os.path.dirname(__file__), "..", "stats", "stats_service.py")
+
+
+def start_replicas(count: int, nats_url: str):
+    processes = []
+    for i in range(count):
+        env = dict(os.environ, NATS_URL=nats_url, STATS_METRICS_PORT=str(9200 + i))
+        processes.append(subprocess.Popen([sys.executable, SERVICE], env=env))
+    return processes
+
+
+def stop_replicas(processes):
+    for process in processes:
+        process.send_signal(signal.SIGTERM)
+    for process in processes:
+        process.wait(timeout=60)
+
+
+async def wait_until_ready(nc: NATS, subject: str, payload: bytes, replicas: int):
+    # Each replica loads its index before subscribing; wait until enough
+    # distinct replicas have answered so the queue group is complete.
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            await nc.request(subject, payload, timeout=1)
+            await asyncio.sleep(0.5 * replicas)
+            return
+        except Exception:
+            await asyncio.sleep(0.5)
+    raise RuntimeError("stats replicas did not come up")
+
+
+async def measure(nc: NATS, subject: str, payload: bytes, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await nc.request(subject, payload, timeout=30)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return requests / elapsed, p50, p99
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nats-url", default="nats://localhost:4222")
+    parser.add_argument("--replicas", default="1,2,4")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--batch", type=int, default=0, help="Countries per batch request, 0 for single CFR")
+    args = parser.parse_args()
+
+    if args.batch:
+        subject = "stats.calculate.cfr.batch"
+        payload = json.dumps({"countries": ["Germany", "France", "Italy", "Spain"] * (args.batch // 4 or 1)}).encode()
+    else:
+        subject = "stats.calculate.cfr"
+        payload = json.dumps({"country": "Germany"}).encode()
+
+    nc = NATS()
+    await nc.connect(args.nats_url)
+    baseline = None
+    try:
+        for count in (int(n) for n in args.replicas.split(",")):
+            processes = start_replicas(count, args.nats_url)
+            try:
+                await wait_until_ready(nc, subject, payload, count)
+                rate, p50, p99 = await measure(nc, subject, payload, args.requests, args.concurrency)
+            finally:
+                stop_replicas(processes)
+
+            baseline = baseline or rate
+            print(
+                f"{count:>3} replicas: {rate:9.1f} req/s  ({rate / baseline:4.2f}x)  "
+                f"p50={p50 * 1000:7.2f}ms  p99={p99 * 1000:7.2f}ms"
+            )
+    finally:
+        await nc.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""Assert that the hot coronavirus queries are index-served and partition-pruned.
+
+Runs EXPLAIN against a loaded database and exits non-zero when a query falls
+back to a sequential scan or touches partitions outside its date range.
+
+    PYTHONPATH=. python benchmarks/check_query_plans.py
+"""
+import sys
+
+from database.db_connect import query_db, close_pool
+from database.models import CORONAVIRUS_PARTITIONS
+
+INDEX_SCANS = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+CHECKS = [
+    (
+        "cases by type for one country and year",
+        """
+        SELECT date, type, SUM(cases) AS cases
+        FROM public.coronavirus_2021
+        WHERE lower(country) = lower(%s)
+        GROUP BY date, type
+        ORDER BY date
+        """,
+        ("Germany",),
+        {"coronavirus_2021"},
+    ),
+    (
+        "CFR totals for one country",
+        """
+        SELECT SUM(cases) AS total
+        FROM public.coronavirus_daily
+        WHERE type = %s AND lower(country) = lower(%s)
+        """,
+        ("confirmed", "Germany"),
+        {m.__tablename__ for m in CORONAVIRUS_PARTITIONS},
+    ),
+    (
+        "date range over the partitioned parent",
+        """
+        SELECT date, SUM(cases) AS cases
+        FROM public.coronavirus_daily
+        WHERE lower(country) = lower(%s) AND type = %s
+          AND date >= %s AND date < %s
+        GROUP BY date
+        """,
+        ("Germany", "confirmed", "2022-03-01", "2022-06-01"),
+        {"coronavirus_2022"},
+    ),
+]
+
+
+def walk(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from walk(child)
+
+
+def check(name, query, params, expected_tables):
+    rows = query_db("EXPLAIN (FORMAT JSON) " + query, params)
+    plan = rows[0]["QUERY PLAN"][0]["Plan"]
+    scans = [(node["Node Type"], node.get("Relation Name")) for node in walk(plan) if "Relation Name" in node]
+
+    problems = []
+    seq_scans = [table for node_type, table in scans if node_type == "Seq Scan"]
+    if seq_scans:
+        problems.append(f"sequential scan on {', '.join(seq_scans)}")
+    if not any(node_type in INDEX_SCANS for node_type, _ in scans):
+        problems.append("no index scan")
+    touched = {table for _, table in scans}
+    if touched - expected_tables:
+        problems.append(f"unpruned partitions {', '.join(sorted(touched - expected_tables))}")
+
+    print(f"[{'FAIL' if problems else ' OK '}] {name}: {', '.join(f'{t} on {r}' for t, r in scans)}")
+    for problem in problems:
+        print(f"       {problem}")
+    return not problems
+
+
+def main():
+    try:
+        query_db("ANALYZE coronavirus_daily; SELECT 1 AS ok;")
+        results = [check(*c) for c in CHECKS]
+    finally:
+        close_pool()
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,96 @@
+import asyncio
+import random
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi import HTTPException, status
+
 from common.config import redis_client, logger
 from common.errors import ErrorCode
+from common.monitoring import CACHE_REQUESTS, CACHE_EVICTIONS, CACHE_ENTRIES
+from common.settings import redis_settings
+
+# Redis values are prefixed with a magic marker and the wall-clock time until
+# which they are fresh; after that they may still be served while stale.
+_ENVELOPE_MAGIC = b"CV1"
+_ENVELOPE = struct.Struct(">d")
+
+# A key whose computation answered 404 is remembered briefly under this marker
+# so repeated lookups of missing data do not each reach the database.
+_NEGATIVE_MAGIC = b"CN1"
+_NOT_FOUND = object()
+
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_inflight = {}
+_refreshing = set()
+_background_tasks = set()
+
+# Seconds of remaining freshness below which get_or_compute recomputes in
+# place instead of returning the cached value. Set by the cache warmer.
+_refresh_ahead = ContextVar("refresh_ahead", default=0.0)
+
+
+class LocalCache:
+    """Size-bounded in-process LRU holding already-decoded values with a TTL."""
+
+    def __init__(self, max_entries: int, ttl: int, tier: str = "local"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.tier = tier
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    CACHE_REQUESTS.labels(tier=self.tier, result="hit").inc()
+                    return True, value
+                del self._entries[key]
+                CACHE_EVICTIONS.labels(tier=self.tier, reason="expired").inc()
+                CACHE_ENTRIES.labels(tier=self.tier).set(len(self._entries))
+        CACHE_REQUESTS.labels(tier=self.tier, result="miss").inc()
+        return False, None
+
+    def set(self, key: str, value, ttl: int = None):
+        ttl = min(ttl, self.ttl) if ttl else self.ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                CACHE_EVICTIONS.labels(tier=self.tier, reason="size").inc()
+            CACHE_ENTRIES.labels(tier=self.tier).set(len(self._entries))
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    CACHE_EVICTIONS.labels(tier=self.tier, reason="invalidated").inc()
+            CACHE_ENTRIES.labels(tier=self.tier).set(len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            CACHE_EVICTIONS.labels(tier=self.tier, reason="invalidated").inc(len(self._entries))
+            self._entries.clear()
+            CACHE_ENTRIES.labels(tier=self.tier).set(0)
+
+
+local_cache = LocalCache(redis_settings.LOCAL_CACHE_MAX_ENTRIES, redis_settings.LOCAL_CACHE_TTL)
 
 
 def get_cache_key(*args: str) -> str:
@@ -7,17 +98,224 @@ def get_cache_key(*args: str) -> str:
     return sha256(":".join(args).encode()).hexdigest()
 
 
-def cache_get(cache_key: str):
+async def cache_get(cache_key: str):
     try:
-        return redis_client.get(cache_key)
+        value = await redis_client.get(cache_key)
     except Exception as e:
         logger.error(f"Error accessing Redis: {e}")
         ErrorCode.REDIS_ERROR.raise_exception()
+    CACHE_REQUESTS.labels(tier="redis", result="hit" if value is not None else "miss").inc()
+    return value
 
 
-def cache_set(cache_key: str, data, ttl: int = 300):
+async def cache_set(cache_key: str, data, ttl: int = 300):
     try:
-        redis_client.setex(cache_key, ttl, data)
+        await redis_client.setex(cache_key, ttl, data)
     except Exception as e:
         logger.error(f"Error writing to Redis: {e}")
         ErrorCode.REDIS_ERROR.raise_exception()
+
+
+def jittered_ttl(ttl: int) -> int:
+    jitter = redis_settings.CACHE_TTL_JITTER
+    return max(1, round(ttl * random.uniform(1 - jitter, 1 + jitter)))
+
+
+def wrap_entry(payload: bytes, fresh_until: float) -> bytes:
+    return _ENVELOPE_MAGIC + _ENVELOPE.pack(fresh_until) + payload
+
+
+def unwrap_entry(raw: bytes):
+    """Return ``(fresh_until, payload)``, or None for foreign or legacy values."""
+    if not raw or not raw.startswith(_ENVELOPE_MAGIC):
+        return None
+    offset = len(_ENVELOPE_MAGIC)
+    (fresh_until,) = _ENVELOPE.unpack_from(raw, offset)
+    return fresh_until, raw[offset + _ENVELOPE.size:]
+
+
+async def _read(cache_key: str, decode):
+    found, entry = local_cache.get(cache_key)
+    if found:
+        return entry
+
+    raw = await cache_get(cache_key)
+    if raw and raw.startswith(_NEGATIVE_MAGIC):
+        (fresh_until,) = _ENVELOPE.unpack_from(raw, len(_NEGATIVE_MAGIC))
+        entry = (fresh_until, _NOT_FOUND)
+        local_cache.set(cache_key, entry, max(1, round(fresh_until - time.time())))
+        return entry
+
+    unwrapped = unwrap_entry(raw)
+    if unwrapped is None:
+        return None
+
+    fresh_until, payload = unwrapped
+    try:
+        entry = (fresh_until, decode(payload) if decode else payload)
+    except Exception as e:
+        logger.error(f"Discarding undecodable cache entry {cache_key}: {e}")
+        return None
+    local_cache.set(cache_key, entry, max(1, round(fresh_until - time.time())))
+    return entry
+
+
+async def _store(cache_key: str, value, encode, ttl: int):
+    ttl = jittered_ttl(ttl)
+    fresh_until = time.time() + ttl
+    payload = encode(value) if encode else value
+    await cache_set(cache_key, wrap_entry(payload, fresh_until), ttl + redis_settings.CACHE_STALE_TTL)
+    local_cache.set(cache_key, (fresh_until, value), ttl)
+
+
+async def _store_not_found(cache_key: str):
+    ttl = redis_settings.CACHE_NEGATIVE_TTL
+    fresh_until = time.time() + ttl
+    await cache_set(cache_key, _NEGATIVE_MAGIC + _ENVELOPE.pack(fresh_until), ttl)
+    local_cache.set(cache_key, (fresh_until, _NOT_FOUND), ttl)
+
+
+def _unwrap_value(value):
+    if value is _NOT_FOUND:
+        ErrorCode.NOT_FOUND.raise_exception()
+    return value
+
+
+async def _acquire_lock(cache_key: str):
+    token = uuid.uuid4().hex
+    try:
+        acquired = await redis_client.set(
+            f"lock:{cache_key}", token, nx=True, ex=redis_settings.CACHE_LOCK_TTL
+        )
+    except Exception as e:
+        logger.error(f"Error acquiring cache lock: {e}")
+        return token
+    return token if acquired else None
+
+
+async def _release_lock(cache_key: str, token: str):
+    try:
+        await redis_client.eval(_RELEASE_LOCK, 1, f"lock:{cache_key}", token)
+    except Exception as e:
+        logger.error(f"Error releasing cache lock: {e}")
+
+
+async def _lock_held(cache_key: str) -> bool:
+    try:
+        return bool(await redis_client.exists(f"lock:{cache_key}"))
+    except Exception as e:
+        logger.error(f"Error checking cache lock: {e}")
+        return False
+
+
+async def _wait_for_peer(cache_key: str, decode):
+    """Poll for the entry another worker is computing. Returns None once its
+    lock is released without a fresh entry (the peer failed or was killed)
+    or after CACHE_LOCK_WAIT seconds."""
+    deadline = time.monotonic() + redis_settings.CACHE_LOCK_WAIT
+    delay = 0.02
+    while time.monotonic() < deadline:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.5)
+        entry = await _read(cache_key, decode)
+        if entry is not None and entry[0] > time.time():
+            return _unwrap_value(entry[1])
+        if not await _lock_held(cache_key):
+            return None
+    return None
+
+
+async def _compute_and_store(cache_key: str, compute, encode, decode, ttl: int, wait_for_peer: bool):
+    token = await _acquire_lock(cache_key)
+    if token is None:
+        if not wait_for_peer:
+            return None
+        value = await _wait_for_peer(cache_key, decode)
+        if value is not None:
+            return value
+        logger.warning(f"Peer did not store {cache_key} in time, computing locally")
+
+    try:
+        try:
+            value = await compute()
+        except HTTPException as e:
+            if e.status_code == status.HTTP_404_NOT_FOUND:
+                await _store_not_found(cache_key)
+            raise
+        await _store(cache_key, value, encode, ttl)
+        return value
+    finally:
+        if token is not None:
+            await _release_lock(cache_key, token)
+
+
+async def _single_flight(cache_key: str, compute, encode, decode, ttl: int):
+    future = _inflight.get(cache_key)
+    if future is not None:
+        return await asyncio.shield(future)
+
+    future = asyncio.get_running_loop().create_future()
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _inflight[cache_key] = future
+    try:
+        value = await _compute_and_store(cache_key, compute, encode, decode, ttl, wait_for_peer=True)
+        future.set_result(value)
+        return value
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    except BaseException:
+        future.cancel()
+        raise
+    finally:
+        _inflight.pop(cache_key, None)
+
+
+async def _refresh(cache_key: str, compute, encode, decode, ttl: int):
+    try:
+        await _compute_and_store(cache_key, compute, encode, decode, ttl, wait_for_peer=False)
+    except Exception as e:
+        logger.error(f"Background refresh of {cache_key} failed: {e}")
+    finally:
+        _refreshing.discard(cache_key)
+
+
+async def get_or_compute(cache_key: str, compute, encode=None, decode=None, ttl: int = None):
+    """Return the cached value for ``cache_key``, computing it at most once.
+
+    Concurrent misses for the same key share one ``compute()`` call within a
+    worker, and a Redis lock makes other workers wait for that result instead
+    of recomputing it. Expired entries are served for up to CACHE_STALE_TTL
+    seconds while a single background refresh runs. TTLs are jittered. A 404
+    raised by ``compute()`` is cached for CACHE_NEGATIVE_TTL seconds.
+    """
+    ttl = ttl or redis_settings.REDIS_CACHE_TTL
+
+    entry = await _read(cache_key, decode)
+    if entry is not None:
+        fresh_until, value = entry
+        if fresh_until - time.time() < _refresh_ahead.get():
+            logger.info(f"Refreshing {cache_key} ahead of expiry")
+            return await _single_flight(cache_key, compute, encode, decode, ttl)
+        if fresh_until <= time.time() and cache_key not in _refreshing:
+            logger.info(f"Serving stale entry for {cache_key} while refreshing")
+            _refreshing.add(cache_key)
+            task = asyncio.create_task(_refresh(cache_key, compute, encode, decode, ttl))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        else:
+            logger.info(f"Cache hit for {cache_key}")
+        return _unwrap_value(value)
+
+    logger.info(f"Cache miss for {cache_key}")
+    return await _single_flight(cache_key, compute, encode, decode, ttl)
+
+
+@contextmanager
+def refresh_ahead(seconds: float):
+    """Within this block, entries expiring in less than ``seconds`` are recomputed."""
+    token = _refresh_ahead.set(seconds)
+    try:
+        yield
+    finally:
+        _refresh_ahead.reset(token)
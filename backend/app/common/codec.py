@@ -0,0 +1,124 @@
+import struct
+import zlib
+
+import msgpack
+import orjson
+import pandas as pd
+
+from common.settings import redis_settings
+from common.utils import frame_columns, frame_from_columns, frame_to_json
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# Every encoded cache payload starts with: magic, format version, codec id,
+# compression id. Decoding dispatches on the header, so entries written with
+# a different configured codec stay readable.
+MAGIC = b"CC"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct(">2sBBB")
+
+
+class CodecError(Exception):
+    pass
+
+
+class JSONCodec:
+    """Stores a frame as a JSON array of row objects."""
+    id = 1
+    name = "json"
+
+    @staticmethod
+    def encode(frame: pd.DataFrame) -> bytes:
+        return frame_to_json(frame)
+
+    @staticmethod
+    def decode(payload: bytes) -> pd.DataFrame:
+        rows = orjson.loads(payload)
+        columns = list(rows[0].keys()) if rows else []
+        return frame_from_columns(columns, zip(*(row.values() for row in rows)) if rows else [])
+
+
+class MsgpackColumnarCodec:
+    """Stores a frame as column names plus one value list per column."""
+    id = 2
+    name = "msgpack"
+
+    @staticmethod
+    def encode(frame: pd.DataFrame) -> bytes:
+        return msgpack.packb([list(frame.columns), frame_columns(frame)], use_bin_type=True)
+
+    @staticmethod
+    def decode(payload: bytes) -> pd.DataFrame:
+        columns, values = msgpack.unpackb(payload, raw=False)
+        return frame_from_columns(columns, values)
+
+
+class _Compression:
+    def __init__(self, id, name, compress, decompress):
+        self.id = id
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+
+
+def _require(module, name):
+    if module is None:
+        raise CodecError(f"Cache compression '{name}' requires the optional '{name}' package")
+    return module
+
+
+CODECS = {codec.name: codec for codec in (JSONCodec, MsgpackColumnarCodec)}
+COMPRESSIONS = {
+    compression.name: compression for compression in (
+        _Compression(0, "none", lambda data: data, lambda data: data),
+        _Compression(1, "zlib", lambda data: zlib.compress(data, 6), zlib.decompress),
+        _Compression(
+            2, "zstd",
+            lambda data: _require(zstandard, "zstd").ZstdCompressor(level=3).compress(data),
+            lambda data: _require(zstandard, "zstd").ZstdDecompressor().decompress(data),
+        ),
+        _Compression(
+            3, "lz4",
+            lambda data: _require(lz4_frame, "lz4").compress(data),
+            lambda data: _require(lz4_frame, "lz4").decompress(data),
+        ),
+    )
+}
+_CODECS_BY_ID = {codec.id: codec for codec in CODECS.values()}
+_COMPRESSIONS_BY_ID = {compression.id: compression for compression in COMPRESSIONS.values()}
+
+
+def encode(frame: pd.DataFrame, codec: str = None, compression: str = None) -> bytes:
+    codec = CODECS[codec or redis_settings.CACHE_CODEC]
+    payload = codec.encode(frame)
+
+    compression = COMPRESSIONS[compression or redis_settings.CACHE_COMPRESSION]
+    if len(payload) < redis_settings.CACHE_COMPRESSION_MIN_BYTES:
+        compression = COMPRESSIONS["none"]
+
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, codec.id, compression.id) + compression.compress(payload)
+
+
+def decode(raw: bytes):
+    try:
+        magic, version, codec_id, compression_id = _HEADER.unpack_from(raw)
+    except struct.error:
+        raise CodecError("Cache payload is too short")
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise CodecError(f"Unsupported cache payload format {magic!r} v{version}")
+
+    try:
+        codec = _CODECS_BY_ID[codec_id]
+        compression = _COMPRESSIONS_BY_ID[compression_id]
+    except KeyError:
+        raise CodecError(f"Unknown cache codec {codec_id} or compression {compression_id}")
+
+    return codec.decode(compression.decompress(raw[_HEADER.size:]))
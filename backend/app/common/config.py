@@ -1,4 +1,4 @@
-import redis
+import redis.asyncio as redis
 import logging
 from common.settings import redis_settings
 
@@ -0,0 +1,65 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+RESOLUTIONS = ("day", "week", "month")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket. This favours visually prominent points
+    but does not guarantee that every local extreme survives.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_series(dates: np.ndarray, values: np.ndarray, max_points: Optional[int]):
+    if not max_points or len(dates) <= max_points:
+        return dates, values
+    keep = lttb(dates.astype("datetime64[ns]").astype(np.int64), values, max_points)
+    return dates[keep], values[keep]
+
+
+def downsample_frame(df: pd.DataFrame, max_points: Optional[int], value_column: str = "cases",
+                     by: Optional[str] = None) -> pd.DataFrame:
+    """Apply LTTB to every series of ``df`` (one per ``by`` value), keeping
+    at most ``max_points`` rows per series in date order."""
+    if not max_points or df.empty:
+        return df
+
+    x = pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    y = pd.to_numeric(df[value_column], errors="coerce").to_numpy(dtype=float)
+    groups = df.groupby(by, sort=False).indices.values() if by else [np.arange(len(df))]
+
+    keep = []
+    for positions in groups:
+        if len(positions) <= max_points:
+            keep.append(positions)
+        else:
+            keep.append(positions[lttb(x[positions], y[positions], max_points)])
+    return df.iloc[np.sort(np.concatenate(keep))].reset_index(drop=True)
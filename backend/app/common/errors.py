@@ -17,6 +17,7 @@ class ErrorCode(Enum):
     SERVICE_UNAVAILABLE = (503, "Service temporarily unavailable")
     TIMEOUT = (504, "Request timed out")
     REDIS_ERROR = (1003, "Redis connection error")
+    TOO_MANY_REQUESTS = (429, "Too many requests, try again later")
 
     def __init__(self, code: int, message: str):
         self._code = code
@@ -30,9 +31,10 @@ class ErrorCode(Enum):
     def message(self):
         return self._message
 
-    def raise_exception(self):
+    def raise_exception(self, headers: dict | None = None):
         logger.error(f"Exception raised: {self.code} - {self.message}")
         raise HTTPException(
             status_code=self.code if 400 <= self.code <= 599 else 500,  # keep it valid HTTP
-            detail={"error_code": self.code, "error_message": self.message}
+            detail={"error_code": self.code, "error_message": self.message},
+            headers=headers
         )
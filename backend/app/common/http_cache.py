@@ -0,0 +1,170 @@
+import gzip
+import hashlib
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import Match
+
+from common.monitoring import HTTP_CACHE_RESPONSES, HTTP_COMPRESSED_RESPONSES
+from common.settings import http_settings
+from database.versions import UNVERSIONED, data_version
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "image/svg+xml")
+
+_rules = {}
+
+
+def http_cache(tables, max_age: int):
+    """Let the HTTP cache middleware validate responses of this endpoint.
+
+    ``tables`` maps the route's path parameters to the tables its response
+    is built from. A response is fully determined by its URL and the data
+    versions of those tables, so the ETag is derived from them and a
+    matching If-None-Match is answered before the endpoint runs.
+    """
+    def decorator(func):
+        _rules[func] = (tables, f"public, max-age={max_age}")
+        return func
+    return decorator
+
+
+def _etag(path: str, query_string: bytes, versions) -> str:
+    query = urlencode(sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)))
+    digest = hashlib.sha256(
+        "\n".join([http_settings.HTTP_ETAG_SEED, path, query, *versions]).encode()
+    ).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _matching_tag(if_none_match: str, etag: str):
+    """The If-None-Match entry matching ``etag`` under weak comparison,
+    ignoring the content-coding suffix added on compression."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return etag
+        tag = candidate.removeprefix("W/").strip('"')
+        for encoding in ("gzip", "br"):
+            tag = tag.removesuffix(f"-{encoding}")
+        if f'"{tag}"' == etag:
+            return candidate
+    return None
+
+
+def _choose_encoding(accept_encoding: str):
+    accepted = {
+        value.split(";")[0].strip().lower()
+        for value in accept_encoding.split(",")
+        if not value.strip().endswith(";q=0")
+    }
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=http_settings.HTTP_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=http_settings.HTTP_GZIP_LEVEL)
+
+
+class HTTPCacheMiddleware:
+    """ETag/If-None-Match, Cache-Control and gzip/brotli for GET responses.
+
+    Only endpoints decorated with ``http_cache`` get validators; compression
+    applies to any single-body JSON, HTML or SVG response above
+    HTTP_COMPRESS_MIN_SIZE, so streamed exports pass through untouched.
+    """
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router
+
+    def _validator(self, scope):
+        for route in self.router.routes:
+            match, child_scope = route.matches(scope)
+            if match != Match.FULL:
+                continue
+            rule = _rules.get(getattr(route, "endpoint", None))
+            if rule is None:
+                return None
+            tables, cache_control = rule
+            versions = [data_version(table) for table in tables(child_scope.get("path_params", {}))]
+            if UNVERSIONED in versions:
+                return None
+            return _etag(scope["path"], scope["query_string"], versions), cache_control
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        validator = self._validator(scope)
+        if validator:
+            etag, cache_control = validator
+            if_none_match = request_headers.get("if-none-match")
+            matched = _matching_tag(if_none_match, etag) if if_none_match else None
+            if matched:
+                HTTP_CACHE_RESPONSES.labels(result="not_modified").inc()
+                await send({
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": [
+                        (b"etag", matched.encode()),
+                        (b"cache-control", cache_control.encode()),
+                        (b"vary", b"Accept-Encoding"),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        encoding = _choose_encoding(request_headers.get("accept-encoding", ""))
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            headers = MutableHeaders(scope=start_message)
+            body = message.get("body", b"")
+            if start_message["status"] == 200:
+                if validator:
+                    HTTP_CACHE_RESPONSES.labels(result="full").inc()
+                    headers["ETag"] = etag
+                    headers["Cache-Control"] = cache_control
+
+                compressible = headers.get("content-type", "").split(";")[0] in COMPRESSIBLE_TYPES
+                if compressible:
+                    headers.add_vary_header("Accept-Encoding")
+                if (
+                    encoding and compressible and not message.get("more_body", False)
+                    and "content-encoding" not in headers
+                    and len(body) >= http_settings.HTTP_COMPRESS_MIN_SIZE
+                ):
+                    body = _compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    if validator:
+                        headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+                    HTTP_COMPRESSED_RESPONSES.labels(encoding=encoding).inc()
+                    message = {**message, "body": body}
+
+            await send(start_message)
+            start_message = None
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Summary
+from prometheus_client import Counter, Gauge, Histogram, Summary
 import functools
 import asyncio
 
@@ -30,3 +30,125 @@ def monitor(func):
         with FUNCTION_DURATION.labels(module=module, function=name).time():
             return func(*args, **kwargs)
     return sync_wrapper
+
+DB_POOL_SIZE = Gauge(
+    'db_pool_connections', 'Connections held by the database pool',
+    ['state']
+)
+
+DB_POOL_MAX_SIZE = Gauge(
+    'db_pool_max_connections', 'Configured upper bound of the database pool'
+)
+
+DB_POOL_WAITING = Gauge(
+    'db_pool_waiting_requests', 'Callers currently blocked waiting for a pooled connection'
+)
+
+DB_POOL_ACQUIRE_DURATION = Histogram(
+    'db_pool_acquire_duration_seconds', 'Time spent waiting to acquire a pooled connection'
+)
+
+DB_POOL_ACQUIRE_TIMEOUTS = Counter(
+    'db_pool_acquire_timeouts_total', 'Connection acquisitions that gave up after DB_POOL_TIMEOUT'
+)
+
+DB_POOL_RECYCLED = Counter(
+    'db_pool_recycled_connections_total', 'Pooled connections closed and replaced',
+    ['reason']
+)
+
+STATS_REQUESTS = Counter(
+    'stats_requests_total', 'Stats requests handled by a replica',
+    ['replica', 'subject', 'status']
+)
+
+STATS_REQUEST_DURATION = Histogram(
+    'stats_request_duration_seconds', 'Time from receiving a stats request to replying',
+    ['replica', 'subject']
+)
+
+STATS_IN_FLIGHT = Gauge(
+    'stats_requests_in_flight', 'Stats requests currently being processed by a replica',
+    ['replica']
+)
+
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Cache lookups by tier and outcome',
+    ['tier', 'result']
+)
+
+CACHE_EVICTIONS = Counter(
+    'cache_evictions_total', 'Entries dropped from a cache tier before expiry',
+    ['tier', 'reason']
+)
+
+CACHE_ENTRIES = Gauge(
+    'cache_entries', 'Entries currently held by a cache tier',
+    ['tier']
+)
+
+EXPORT_ROWS = Counter(
+    'export_rows_total', 'Rows streamed by the export endpoint',
+    ['table', 'format']
+)
+
+EXPORT_ACTIVE = Gauge(
+    'export_streams_active', 'Export streams currently holding a database connection'
+)
+
+PLOT_RENDER_DURATION = Histogram(
+    'plot_render_duration_seconds', 'Time a plot worker spends rendering one figure',
+    ['format']
+)
+
+PLOT_RENDERS_IN_FLIGHT = Gauge(
+    'plot_renders_in_flight', 'Plot renders queued or running on the worker pool'
+)
+
+CACHE_WARM_KEYS = Gauge(
+    'cache_warm_keys', 'Keys of the current or last warm-up run by state',
+    ['state']
+)
+
+CACHE_WARM_COVERAGE = Gauge(
+    'cache_warm_coverage_ratio', 'Share of tracked request popularity covered by keys warmed in the last run'
+)
+
+CACHE_WARM_DURATION = Histogram(
+    'cache_warm_duration_seconds', 'Duration of a cache warm-up run'
+)
+
+AUTH_DURATION = Histogram(
+    'auth_duration_seconds', 'Time spent authenticating a request by where the user came from',
+    ['source'],
+    buckets=(.00005, .0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1)
+)
+
+PASSWORD_HASH_DURATION = Histogram(
+    'password_hash_duration_seconds', 'Time a hashing worker spends on one password operation',
+    ['operation']
+)
+
+PASSWORD_HASH_WAIT = Histogram(
+    'password_hash_queue_wait_seconds', 'Time a password operation waits for a hashing worker',
+    ['operation']
+)
+
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    'password_hash_queue_depth', 'Password operations submitted to the hashing pool and not yet finished'
+)
+
+PASSWORD_HASH_REJECTED = Counter(
+    'password_hash_rejected_total', 'Password operations refused with 429 because the hashing queue was full',
+    ['operation']
+)
+
+HTTP_CACHE_RESPONSES = Counter(
+    'http_cache_responses_total', 'Responses of cacheable endpoints by whether the client copy was still valid',
+    ['result']
+)
+
+HTTP_COMPRESSED_RESPONSES = Counter(
+    'http_compressed_responses_total', 'Responses compressed by the HTTP cache middleware',
+    ['encoding']
+)
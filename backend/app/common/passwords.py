@@ -0,0 +1,91 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+from common.config import logger
+from common.errors import ErrorCode
+from common.monitoring import (
+    PASSWORD_HASH_DURATION, PASSWORD_HASH_WAIT, PASSWORD_HASH_QUEUE_DEPTH, PASSWORD_HASH_REJECTED
+)
+from common.settings import settings
+
+# Hashes with fewer rounds than configured are flagged by verify_and_update
+# and replaced on the next successful login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.AUTH_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.AUTH_BCRYPT_ROUNDS,
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = 0
+
+
+def _hash(password: str):
+    started_at = time.time()
+    return pwd_context.hash(password), started_at, time.time() - started_at
+
+
+def _verify_and_update(password: str, hashed_password: str):
+    started_at = time.time()
+    return pwd_context.verify_and_update(password, hashed_password), started_at, time.time() - started_at
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = settings.AUTH_HASH_WORKERS
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info(f"Started {workers} password hashing processes")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+async def _submit(operation: str, func, *args):
+    """Run ``func`` on the hashing pool, or answer 429 when AUTH_HASH_QUEUE_LIMIT
+    operations are already submitted and not yet finished."""
+    global _pending
+    if _pending >= settings.AUTH_HASH_QUEUE_LIMIT:
+        PASSWORD_HASH_REJECTED.labels(operation=operation).inc()
+        ErrorCode.TOO_MANY_REQUESTS.raise_exception(headers={"Retry-After": "1"})
+
+    loop = asyncio.get_running_loop()
+    _pending += 1
+    PASSWORD_HASH_QUEUE_DEPTH.set(_pending)
+    submitted_at = time.time()
+    try:
+        result, started_at, seconds = await loop.run_in_executor(get_executor(), func, *args)
+    finally:
+        _pending -= 1
+        PASSWORD_HASH_QUEUE_DEPTH.set(_pending)
+    PASSWORD_HASH_WAIT.labels(operation=operation).observe(max(0.0, started_at - submitted_at))
+    PASSWORD_HASH_DURATION.labels(operation=operation).observe(seconds)
+    return result
+
+
+async def hash_password(password: str) -> str:
+    return await _submit("hash", _hash, password)
+
+
+async def verify_password(password: str, hashed_password: str):
+    """Return ``(valid, new_hash)``; ``new_hash`` is set when the stored hash
+    uses outdated parameters and should be replaced."""
+    return await _submit("verify", _verify_and_update, password, hashed_password)
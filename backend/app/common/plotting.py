@@ -0,0 +1,144 @@
+import asyncio
+import html
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.dates import AutoDateLocator, DateFormatter, date2num
+from matplotlib.figure import Figure
+from plotly.offline import get_plotlyjs_version
+
+from common.config import logger
+from common.monitoring import PLOT_RENDER_DURATION, PLOT_RENDERS_IN_FLIGHT
+from common.settings import plot_settings
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "webp": "image/webp",
+}
+
+PLOTLY_CDN_URL = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
+_PLOTLY_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{cdn_url}"></script>
+</head>
+<body>
+<div id="figure" style="width:100%;height:95vh"></div>
+<script>
+const figure = {figure};
+Plotly.newPlot("figure", figure.data, figure.layout, {{responsive: true}});
+</script>
+</body>
+</html>
+"""
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Per worker process: one figure with its axes, locator and formatter set up
+# once and reused by every render in that process.
+_template = None
+
+
+def _line_template():
+    figure = Figure(figsize=(12, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    (line,) = ax.plot([], [], marker='o', linestyle='-', linewidth=2)
+    ax.xaxis_date()
+    ax.xaxis.set_major_locator(AutoDateLocator())
+    ax.xaxis.set_major_formatter(DateFormatter('%Y-%m-%d'))
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_xlabel("Date")
+    return figure, ax, line
+
+
+def render_line_plot(dates: np.ndarray, values: np.ndarray, column_name: str, fmt: str = "png"):
+    """Render ``values`` over ``dates`` and return ``(image bytes, seconds spent)``.
+
+    Runs inside a plot worker process; only the object-oriented Figure API is
+    used, so no global pyplot state is involved.
+    """
+    global _template
+    start = time.perf_counter()
+    if _template is None:
+        _template = _line_template()
+    figure, ax, line = _template
+
+    label = column_name.replace("_", " ").title()
+    line.set_data(date2num(dates), values)
+    ax.relim()
+    ax.autoscale_view()
+    ax.set_ylabel(label)
+    ax.set_title(f"{label} Over Time")
+    figure.tight_layout()
+
+    buf = io.BytesIO()
+    figure.savefig(buf, format=fmt)
+    return buf.getvalue(), time.perf_counter() - start
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = plot_settings.PLOT_WORKERS or os.cpu_count() or 1
+                # Spawned rather than forked: the server process has threads
+                # and open sockets that must not be copied into workers.
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=plot_settings.PLOT_MAX_TASKS_PER_CHILD or None,
+                )
+                logger.info(f"Started {workers} plot rendering processes")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def plot_series(dates: pd.Series, values: pd.Series):
+    """Parse dates in one vectorized pass and keep only points with both a
+    valid date and a value."""
+    parsed = pd.to_datetime(dates, errors="coerce")
+    numeric = pd.to_numeric(values, errors="coerce")
+    valid = parsed.notna() & numeric.notna()
+    return parsed[valid].to_numpy(dtype="datetime64[ns]"), numeric[valid].to_numpy(dtype=float)
+
+
+async def render_plot(dates: np.ndarray, values: np.ndarray, column_name: str, fmt: str = "png") -> bytes:
+    """Render a line plot on the worker pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    PLOT_RENDERS_IN_FLIGHT.inc()
+    try:
+        image, seconds = await loop.run_in_executor(
+            get_executor(), render_line_plot, dates, values, column_name, fmt
+        )
+    finally:
+        PLOT_RENDERS_IN_FLIGHT.dec()
+    PLOT_RENDER_DURATION.labels(format=fmt).observe(seconds)
+    return image
+
+
+def plotly_page(figure_json: bytes, title: str) -> str:
+    """Minimal HTML page drawing a Plotly figure spec with plotly.js from the CDN."""
+    # "</" inside the inlined JSON must not be able to close the script tag.
+    figure = figure_json.decode("utf-8").replace("</", "<\\/")
+    return _PLOTLY_PAGE.format(title=html.escape(title), cdn_url=PLOTLY_CDN_URL, figure=figure)
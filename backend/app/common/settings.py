@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import List
+from typing import List, Literal
 
 
 class ConfiguredBaseSettings(BaseSettings):
@@ -16,6 +16,13 @@ class DatabaseSettings(ConfiguredBaseSettings):
     DB_NAME: str = Field(..., description="Database name")
     DB_USER: str = Field(..., description="Database username")
     DB_PASSWORD: str = Field(..., description="Database password")
+    DB_POOL_MIN_SIZE: int = Field(1, description="Connections opened eagerly and kept idle in the pool")
+    DB_POOL_MAX_SIZE: int = Field(10, description="Upper bound on open connections per process")
+    DB_POOL_TIMEOUT: float = Field(10.0, description="Seconds to wait for a free pooled connection")
+    DB_POOL_MAX_LIFETIME: float = Field(1800.0, description="Seconds before a psycopg2 pooled connection is recycled")
+    DB_POOL_MAX_IDLE: float = Field(300.0, description="Seconds an idle asyncpg connection is kept before it is closed")
+    DB_POOL_HEALTH_CHECK_INTERVAL: float = Field(30.0, description="Idle seconds after which a connection is pinged on checkout")
+    DB_EXPORT_BATCH_SIZE: int = Field(5000, description="Rows fetched per round trip by streaming exports")
 
     @property
     def uri(self):
@@ -31,14 +38,63 @@ class RedisSettings(ConfiguredBaseSettings):
     REDIS_HOST: str = Field(..., description="Redis host address")
     REDIS_PORT: int = Field(..., description="Redis port")
     REDIS_CACHE_TTL: int = Field(..., description="Redis cache time-to-live in seconds")
+    LOCAL_CACHE_MAX_ENTRIES: int = Field(512, description="Decoded entries kept in each worker's in-process cache")
+    LOCAL_CACHE_TTL: int = Field(30, description="Seconds an entry may be served from the in-process cache")
+    CACHE_STALE_TTL: int = Field(60, description="Seconds an expired entry may still be served while it is recomputed")
+    CACHE_TTL_JITTER: float = Field(0.1, description="Fraction by which TTLs are randomly spread to avoid synchronized expiry")
+    CACHE_LOCK_TTL: int = Field(30, description="Seconds a worker may hold the recompute lock for a key")
+    CACHE_LOCK_WAIT: float = Field(10.0, description="Seconds to wait for another worker's recompute before computing locally")
+    CACHE_NEGATIVE_TTL: int = Field(5, description="Seconds a not-found result is cached")
+    CACHE_CODEC: Literal["json", "msgpack"] = Field("msgpack", description="Serialization used for cached datasets")
+    CACHE_COMPRESSION: Literal["none", "zlib", "zstd", "lz4"] = Field("zstd", description="Compression applied to cached datasets")
+    CACHE_COMPRESSION_MIN_BYTES: int = Field(1024, description="Payloads smaller than this are stored uncompressed")
+    CACHE_VERSIONED_TTL: int = Field(86400, description="TTL for entries whose keys embed the data version")
+    CACHE_VERSION_REFRESH_INTERVAL: float = Field(60.0, description="Seconds between re-reads of table data versions")
+    CACHE_WARM_ENABLED: bool = Field(True, description="Run the background cache warmer in this process")
+    CACHE_WARM_TOP_N: int = Field(50, description="Most requested keys recomputed by each warm-up run")
+    CACHE_WARM_CONCURRENCY: int = Field(4, description="Keys recomputed concurrently during a warm-up run")
+    CACHE_WARM_INTERVAL: float = Field(60.0, description="Seconds between warm-up runs")
+    CACHE_WARM_DECAY: float = Field(0.9, description="Factor applied to popularity scores after every run")
+    CACHE_WARM_MAX_TRACKED: int = Field(1000, description="Distinct requests kept in the popularity ranking")
+    CACHE_POPULARITY_FLUSH_INTERVAL: float = Field(10.0, description="Seconds between flushes of local access counts to Redis")
 
 
 class Settings(ConfiguredBaseSettings):
     SECRET_KEY: str = Field(..., description="JWT Secret Key")
     ALLOW_ORIGINS: List[str] = Field(..., description="List of allowed origins for CORS")
     NATS_URL: str = Field(..., description="NATS server URL")
+    AUTH_CACHE_MAX_ENTRIES: int = Field(10000, description="Verified tokens kept in each worker's in-process cache")
+    AUTH_CACHE_TTL: int = Field(60, description="Seconds a verified token is trusted without decoding it again")
+    AUTH_BCRYPT_ROUNDS: int = Field(12, description="bcrypt cost; stored hashes below it are upgraded on login")
+    AUTH_HASH_WORKERS: int = Field(2, description="Processes dedicated to password hashing")
+    AUTH_HASH_QUEUE_LIMIT: int = Field(32, description="Hashing operations in flight before requests get 429")
+
+
+class StatsSettings(ConfiguredBaseSettings):
+    STATS_INDEX_REFRESH_INTERVAL: float = Field(60.0, description="Seconds between checks for reloaded data")
+    STATS_QUEUE_GROUP: str = Field("stats", description="NATS queue group shared by stats replicas")
+    STATS_MAX_IN_FLIGHT: int = Field(64, description="Requests a replica processes concurrently before it stops reading")
+    STATS_PENDING_MSGS_LIMIT: int = Field(10000, description="Messages NATS buffers per subscription before dropping")
+    STATS_WORKERS: int = Field(4, description="Threads for blocking stats work")
+    STATS_DRAIN_TIMEOUT: float = Field(30.0, description="Seconds to wait for in-flight requests on shutdown")
+    STATS_METRICS_PORT: int = Field(9101, description="Port of the replica's Prometheus endpoint, 0 to disable")
+
+
+class PlotSettings(ConfiguredBaseSettings):
+    PLOT_WORKERS: int = Field(0, description="Plot rendering processes, 0 for one per CPU core")
+    PLOT_MAX_TASKS_PER_CHILD: int = Field(500, description="Renders after which a plot worker process is replaced")
+
+
+class HttpSettings(ConfiguredBaseSettings):
+    HTTP_ETAG_SEED: str = Field("1", description="Change to invalidate every ETag, e.g. after changing how responses render")
+    HTTP_COMPRESS_MIN_SIZE: int = Field(1024, description="Bytes below which responses are sent uncompressed")
+    HTTP_GZIP_LEVEL: int = Field(6, description="gzip compression level")
+    HTTP_BROTLI_QUALITY: int = Field(5, description="Brotli quality, when the brotli package is installed")
 
 
 settings = Settings()
 database_settings = DatabaseSettings()
-redis_settings = RedisSettings()
\ No newline at end of file
+redis_settings = RedisSettings()
+stats_settings = StatsSettings()
+plot_settings = PlotSettings()
+http_settings = HttpSettings()
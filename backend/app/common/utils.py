@@ -1,8 +1,12 @@
+import heapq
+import itertools
 import time
 from functools import wraps
 from numpy import isinf
 from pandas import isna
 import json
+import numpy as np
+import pandas as pd
 from datetime import datetime, date
 from common.config import logger
 
@@ -37,4 +41,70 @@ class CustomJSONEncoder(json.JSONEncoder):
         serialized_obj = serialize_value(obj)
         if serialized_obj is not obj:
             return serialized_obj
-        return super().default(obj)
\ No newline at end of file
+        return super().default(obj)
+
+_DATE_UNITS = {"date": "D", "datetime": "s", "datetime64": "s"}
+
+
+def frame_from_columns(columns, values) -> pd.DataFrame:
+    """Build a frame from per-column value lists, keeping nullable ints as ints."""
+    return pd.DataFrame({name: pd.array(list(column)) for name, column in zip(columns, values)}, columns=columns)
+
+
+def frame_from_rows(columns, rows) -> pd.DataFrame:
+    if not rows:
+        return pd.DataFrame(columns=columns)
+    return frame_from_columns(columns, zip(*rows))
+
+
+def merge_sorted_frames(frames, key, value) -> pd.DataFrame:
+    """Streaming k-way merge of frames that are each sorted by the ``key`` columns.
+
+    Rows with equal keys in different frames, such as a week spanning two
+    yearly tables, are combined by summing ``value``.
+    """
+    columns = [*key, value]
+    streams = [zip(*frame_columns(frame[columns])) for frame in frames]
+    rows = []
+    for row_key, group in itertools.groupby(heapq.merge(*streams, key=lambda row: row[:-1]), key=lambda row: row[:-1]):
+        values = [row[-1] for row in group]
+        rows.append((*row_key, values[0] if len(values) == 1 else sum(v for v in values if v is not None)))
+    return frame_from_rows(columns, rows)
+
+
+def iso_strings(column: pd.Series, unit: str) -> np.ndarray:
+    values = pd.to_datetime(column).to_numpy().astype(f"datetime64[{unit}]")
+    strings = np.datetime_as_string(values, unit=unit).astype(object)
+    strings[np.isnat(values)] = None
+    return strings
+
+
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Columnar counterpart of ``clean_data``.
+
+    Infinite floats become nulls and date/datetime columns become ISO strings,
+    one vectorized operation per column.
+    """
+    for name in df.columns:
+        column = df[name]
+        if pd.api.types.is_float_dtype(column.dtype):
+            df[name] = column.mask(column.isin([np.inf, -np.inf]))
+            continue
+
+        kind = pd.api.types.infer_dtype(column, skipna=True)
+        if kind in _DATE_UNITS:
+            df[name] = iso_strings(column, _DATE_UNITS[kind])
+    return df
+
+
+def frame_columns(df: pd.DataFrame) -> list:
+    """Per-column value lists with every missing value as None."""
+    return [df[name].to_numpy(dtype=object, na_value=None).tolist() for name in df.columns]
+
+
+def frame_to_json(df: pd.DataFrame) -> bytes:
+    """Serialize ``df`` as a list of records straight from its columns.
+
+    Floats keep 15 significant digits, the most ``DataFrame.to_json`` writes.
+    """
+    return df.to_json(orient="records", date_format="iso", double_precision=15, force_ascii=False).encode()
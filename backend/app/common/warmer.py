@@ -0,0 +1,146 @@
+import asyncio
+import json
+import socket
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from common.cache import refresh_ahead
+from common.config import redis_client, logger
+from common.monitoring import CACHE_WARM_KEYS, CACHE_WARM_COVERAGE, CACHE_WARM_DURATION
+from common.settings import redis_settings
+
+POPULARITY_KEY = "cache:popularity"
+LEADER_KEY = "cache:warmer:leader"
+
+_recomputers = {}
+_counts = Counter()
+_tasks = []
+_warming = ContextVar("warming", default=False)
+
+
+def warmable(name: str):
+    """Register an endpoint handler so tracked requests to it can be replayed."""
+    def decorator(func):
+        _recomputers[name] = func
+        return func
+    return decorator
+
+
+def track(name: str, **params):
+    """Count one request to the warmable handler ``name`` with ``params``.
+
+    Counts are kept locally and flushed to a Redis sorted set shared by all
+    workers; replays by the warmer itself are not counted.
+    """
+    if _warming.get():
+        return
+    _counts[json.dumps([name, params], sort_keys=True)] += 1
+
+
+async def flush():
+    if not _counts:
+        return
+    counts = dict(_counts)
+    _counts.clear()
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for member, count in counts.items():
+                pipe.zincrby(POPULARITY_KEY, count, member)
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Error flushing cache popularity counts: {e}")
+
+
+async def _replay(member: bytes, semaphore: asyncio.Semaphore, ahead: float) -> bool:
+    try:
+        try:
+            name, params = json.loads(member)
+            recompute = _recomputers[name]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Skipping unknown warm-up entry {member!r}: {e}")
+            return False
+
+        async with semaphore:
+            _warming.set(True)
+            try:
+                with refresh_ahead(ahead):
+                    await recompute(**params)
+                return True
+            except Exception as e:
+                logger.warning(f"Warming {name} {params} failed: {e}")
+                return False
+    finally:
+        CACHE_WARM_KEYS.labels(state="pending").dec()
+
+
+async def warm(top_n: int, concurrency: int, ahead: float):
+    """Recompute the ``top_n`` most requested keys that are missing or expire
+    within ``ahead`` seconds, at most ``concurrency`` at a time."""
+    ranking = await redis_client.zrevrange(
+        POPULARITY_KEY, 0, redis_settings.CACHE_WARM_MAX_TRACKED - 1, withscores=True
+    )
+    total = sum(score for _, score in ranking)
+    top = ranking[:top_n]
+
+    CACHE_WARM_KEYS.labels(state="pending").set(len(top))
+    CACHE_WARM_KEYS.labels(state="done").set(0)
+    CACHE_WARM_KEYS.labels(state="failed").set(0)
+
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(*(_replay(member, semaphore, ahead) for member, _ in top))
+    CACHE_WARM_DURATION.observe(time.perf_counter() - start)
+
+    warmed = sum(score for (_, score), ok in zip(top, results) if ok)
+    CACHE_WARM_KEYS.labels(state="done").set(sum(results))
+    CACHE_WARM_KEYS.labels(state="failed").set(len(results) - sum(results))
+    CACHE_WARM_COVERAGE.set(warmed / total if total else 0)
+    logger.info(f"Cache warm-up refreshed {sum(results)}/{len(top)} keys covering {warmed:.0f}/{total:.0f} requests")
+
+    # Let old popularity fade so the ranking follows current traffic.
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.zunionstore(POPULARITY_KEY, {POPULARITY_KEY: redis_settings.CACHE_WARM_DECAY})
+        pipe.zremrangebyrank(POPULARITY_KEY, 0, -redis_settings.CACHE_WARM_MAX_TRACKED - 1)
+        await pipe.execute()
+
+
+async def _warm_periodically():
+    interval = redis_settings.CACHE_WARM_INTERVAL
+    owner = socket.gethostname()
+    while True:
+        try:
+            # One warm-up per interval across all workers and replicas.
+            if await redis_client.set(LEADER_KEY, owner, nx=True, ex=max(1, int(interval * 0.9))):
+                await warm(
+                    redis_settings.CACHE_WARM_TOP_N,
+                    redis_settings.CACHE_WARM_CONCURRENCY,
+                    ahead=2 * interval,
+                )
+        except Exception as e:
+            logger.error(f"Cache warm-up failed: {e}")
+        await asyncio.sleep(interval)
+
+
+async def _flush_periodically():
+    while True:
+        await asyncio.sleep(redis_settings.CACHE_POPULARITY_FLUSH_INTERVAL)
+        await flush()
+
+
+def start_warmer():
+    if _tasks or not redis_settings.CACHE_WARM_ENABLED:
+        return
+    _tasks.extend([
+        asyncio.create_task(_warm_periodically()),
+        asyncio.create_task(_flush_periodically()),
+    ])
+    logger.info("Cache warmer started")
+
+
+async def stop_warmer():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    await flush()
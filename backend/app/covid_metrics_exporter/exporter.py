@@ -1,71 +1,319 @@
-from prometheus_client import start_http_server, Gauge
+from prometheus_client import start_http_server, Gauge, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
 import pandas as pd
+import resource
+import tempfile
+import threading
 import time
 import os
 import glob
 
-cases_metric = Gauge('covid_cases_total', 'Total confirmed COVID-19 cases', ['country', 'lat', 'lon'])
-deaths_metric = Gauge('covid_deaths_total', 'Total COVID-19 deaths', ['country', 'lat', 'lon'])
-vaccinated_metric = Gauge('covid_vaccinated_total', 'People with at least one vaccine dose', ['country', 'lat', 'lon'])
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
 
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+SOURCE = os.environ.get("COVID_EXPORTER_SOURCE", "csv")
 DATA_DIR = os.environ.get("COVID_DATA_DIR", "./data")
+CACHE_DIR = os.environ.get("COVID_CACHE_DIR", os.path.join(tempfile.gettempdir(), "covid_exporter_cache"))
+REFRESH_INTERVAL = float(os.environ.get("COVID_REFRESH_INTERVAL", "60"))
+SCRAPE_CACHE_SECONDS = float(os.environ.get("COVID_SCRAPE_CACHE_SECONDS", "60"))
+SCRAPE_RETRY_SECONDS = float(os.environ.get("COVID_SCRAPE_RETRY_SECONDS", "5"))
+
+LABELS = ["country", "lat", "lon"]
+
+CASES_COLUMNS = {"country": "category", "lat": "float64", "long": "float64", "type": "category", "cases": "float64"}
+VACCINE_COLUMNS = {"country_region": "category", "lat": "float64", "long": "float64", "people_at_least_one_dose": "float64"}
+
+refresh_duration = Histogram('covid_exporter_refresh_duration_seconds', 'Time spent refreshing the exported aggregates')
+files_parsed = Gauge('covid_exporter_files_parsed', 'CSV files re-parsed by the last refresh')
+resident_memory = Gauge('covid_exporter_max_rss_bytes', 'Peak resident memory of the exporter')
+collect_duration = Histogram('covid_exporter_collect_duration_seconds', 'Time spent querying the database rollups')
+collect_errors = Gauge('covid_exporter_collect_failed', '1 if the last database collection failed')
+
+# confirmed, death and vaccinated totals per location in one round trip,
+# read from the rollup tables the data loader maintains.
+TOTALS_QUERY = """
+    SELECT type AS metric, country, lat, long, SUM(cases)::double precision AS value
+    FROM coronavirus_location_rollup
+    WHERE type IN ('confirmed', 'death')
+    GROUP BY type, country, lat, long
+    UNION ALL
+    SELECT 'vaccinated', country, lat, long, people_at_least_one_dose
+    FROM covid19_vaccine_location_rollup
+"""
+
+FAMILIES = {
+    "confirmed": ('covid_cases_total', 'Total confirmed COVID-19 cases'),
+    "death": ('covid_deaths_total', 'Total COVID-19 deaths'),
+    "vaccinated": ('covid_vaccinated_total', 'People with at least one vaccine dose'),
+}
+
+
+def aggregate_cases(path):
+    """Per-file partial totals: SUM(cases) per country/lat/long for confirmed and death rows."""
+    df = pd.read_csv(path, usecols=list(CASES_COLUMNS), dtype=CASES_COLUMNS, engine=CSV_ENGINE)
+    df = df.dropna(subset=list(CASES_COLUMNS))
+    df = df[df["type"].isin(["confirmed", "death"])]
+    return df.groupby(["type", "country", "lat", "long"], observed=True)["cases"].sum().reset_index()
+
+
+def aggregate_vaccinations(path):
+    """Per-file partial maxima of people_at_least_one_dose per country/lat/long."""
+    df = pd.read_csv(path, usecols=list(VACCINE_COLUMNS), dtype=VACCINE_COLUMNS, engine=CSV_ENGINE)
+    df = df.dropna(subset=list(VACCINE_COLUMNS))
+    df = df.rename(columns={"country_region": "country", "people_at_least_one_dose": "value"})
+    return df.groupby(["country", "lat", "long"], observed=True)["value"].max().reset_index()
 
-def load_cases_and_deaths():
-    pattern = os.path.join(DATA_DIR, "coronavirus_*.csv")
-    files = glob.glob(pattern)
 
-    all_data = []
+class AggregateCache:
+    """Partial aggregates per source file, re-parsed only when a file's mtime or size changes.
 
-    for file in files:
+    Partials are also written as Parquet to CACHE_DIR so a restart does not
+    have to parse unchanged CSVs again.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._entries = {}
+
+    def _parquet_path(self, path, signature):
+        name = os.path.basename(path)
+        return os.path.join(self.cache_dir, f"{name}.{signature[0]}.{signature[1]}.parquet")
+
+    def _load_persisted(self, path, signature):
+        parquet_path = self._parquet_path(path, signature)
+        if CSV_ENGINE != "pyarrow" or not os.path.exists(parquet_path):
+            return None
+        try:
+            return pd.read_parquet(parquet_path)
+        except Exception as e:
+            print(f"Ignoring unreadable cache {parquet_path}: {e}")
+            return None
+
+    def _persist(self, path, signature, partial):
+        if CSV_ENGINE != "pyarrow":
+            return
         try:
-            df = pd.read_csv(file, low_memory=False, usecols=["country", "lat", "long", "type", "cases"])
-            all_data.append(df)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for stale in glob.glob(os.path.join(self.cache_dir, f"{os.path.basename(path)}.*.parquet")):
+                os.remove(stale)
+            partial.to_parquet(self._parquet_path(path, signature), index=False)
         except Exception as e:
-            print(f"Error reading {file}: {e}")
+            print(f"Could not write aggregate cache for {path}: {e}")
+
+    def get(self, path, aggregate):
+        """Return ``(partial, parsed)`` for ``path``; ``parsed`` is True if the CSV was read."""
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(path)
+        if entry and entry[0] == signature:
+            return entry[1], False
+
+        partial = self._load_persisted(path, signature)
+        parsed = partial is None
+        if parsed:
+            partial = aggregate(path)
+            self._persist(path, signature, partial)
+        self._entries[path] = (signature, partial)
+        return partial, parsed
+
+    def retain(self, paths):
+        for path in set(self._entries) - set(paths):
+            del self._entries[path]
+
+    def signature(self):
+        return tuple(sorted((path, entry[0]) for path, entry in self._entries.items()))
 
-    if not all_data:
-        return
 
-    df_all = pd.concat(all_data)
-    df_all = df_all.dropna(subset=["country", "lat", "long", "type", "cases"])
+def build_family(name, documentation, totals):
+    """One gauge family from a ``country, lat, long, value`` frame, built once per refresh."""
+    family = GaugeMetricFamily(name, documentation, labels=LABELS)
+    lat = totals["lat"].astype(float).astype(str)
+    lon = totals["long"].astype(float).astype(str)
+    for country, lat_label, lon_label, value in zip(totals["country"], lat, lon, totals["value"].astype(float)):
+        family.add_metric([country, lat_label, lon_label], value)
+    return family
 
-    confirmed = df_all[df_all["type"] == "confirmed"]
-    deaths = df_all[df_all["type"] == "death"]
 
-    confirmed_grouped = confirmed.groupby(["country", "lat", "long"])["cases"].sum().reset_index()
-    deaths_grouped = deaths.groupby(["country", "lat", "long"])["cases"].sum().reset_index()
+class CovidCollector:
+    """Serves the metric families prepared by the last refresh.
 
-    for _, row in confirmed_grouped.iterrows():
-        cases_metric.labels(
-            country=row['country'], lat=str(float(row['lat'])), lon=str(float(row['long']))
-        ).set(row['cases'])
+    A scrape only yields already-built families; all pandas work happens in
+    ``refresh`` and only when a source file changed.
+    """
 
-    for _, row in deaths_grouped.iterrows():
-        deaths_metric.labels(
-            country=row['country'], lat=str(float(row['lat'])), lon=str(float(row['long']))
-        ).set(row['cases'])
+    def __init__(self, data_dir=DATA_DIR, cache_dir=CACHE_DIR):
+        self.data_dir = data_dir
+        self.cache = AggregateCache(cache_dir)
+        self._families = []
+        self._signature = None
+        self._lock = threading.Lock()
 
-def load_vaccinations():
-    path = os.path.join(DATA_DIR, "covid19_vaccine.csv")
-    try:
-        df = pd.read_csv(path, usecols=["country_region", "lat", "long", "people_at_least_one_dose"])
-        df = df.dropna(subset=["country_region", "lat", "long", "people_at_least_one_dose"])
-        grouped = df.groupby(["country_region", "lat", "long"])["people_at_least_one_dose"].max().reset_index()
+    def _totals(self):
+        case_files = sorted(glob.glob(os.path.join(self.data_dir, "coronavirus_*.csv")))
+        vaccine_path = os.path.join(self.data_dir, "covid19_vaccine.csv")
+        vaccine_files = [vaccine_path] if os.path.exists(vaccine_path) else []
+        self.cache.retain(case_files + vaccine_files)
 
-        for _, row in grouped.iterrows():
-            vaccinated_metric.labels(
-                country=row['country_region'], lat=str(float(row['lat'])), lon=str(float(row['long']))
-            ).set(row['people_at_least_one_dose'])
+        parsed = 0
+        case_partials = []
+        for path in case_files:
+            try:
+                partial, was_parsed = self.cache.get(path, aggregate_cases)
+                case_partials.append(partial)
+                parsed += was_parsed
+            except Exception as e:
+                print(f"Error reading {path}: {e}")
 
-    except Exception as e:
-        print(f"Error reading vaccine data: {e}")
+        vaccine_partials = []
+        for path in vaccine_files:
+            try:
+                partial, was_parsed = self.cache.get(path, aggregate_vaccinations)
+                vaccine_partials.append(partial)
+                parsed += was_parsed
+            except Exception as e:
+                print(f"Error reading vaccine data: {e}")
+
+        return case_partials, vaccine_partials, parsed
+
+    def refresh(self):
+        start = time.perf_counter()
+        case_partials, vaccine_partials, parsed = self._totals()
+        files_parsed.set(parsed)
+        signature = self.cache.signature()
+        if signature == self._signature:
+            refresh_duration.observe(time.perf_counter() - start)
+            return False
+
+        families = []
+        if case_partials:
+            cases = pd.concat(case_partials).groupby(["type", "country", "lat", "long"], observed=True)["cases"].sum()
+            cases = cases.rename("value").reset_index()
+            families.append(build_family(
+                'covid_cases_total', 'Total confirmed COVID-19 cases', cases[cases["type"] == "confirmed"]
+            ))
+            families.append(build_family(
+                'covid_deaths_total', 'Total COVID-19 deaths', cases[cases["type"] == "death"]
+            ))
+        if vaccine_partials:
+            vaccinated = pd.concat(vaccine_partials).groupby(["country", "lat", "long"], observed=True)["value"].max()
+            families.append(build_family(
+                'covid_vaccinated_total', 'People with at least one vaccine dose', vaccinated.reset_index()
+            ))
+
+        with self._lock:
+            self._families = families
+            self._signature = signature
+        refresh_duration.observe(time.perf_counter() - start)
+        return True
+
+    def collect(self):
+        with self._lock:
+            families = self._families
+        yield from families
+
+
+class DatabaseCollector:
+    """Serves the totals from the database rollups instead of the CSVs.
+
+    A scrape runs TOTALS_QUERY at most once per ``cache_seconds``, or once per
+    ``retry_seconds`` after a failed query; in between, the last families are
+    served.
+    """
+
+    def __init__(self, cache_seconds=SCRAPE_CACHE_SECONDS, retry_seconds=SCRAPE_RETRY_SECONDS):
+        if psycopg2 is None:
+            raise RuntimeError("COVID_EXPORTER_SOURCE=db requires the 'psycopg2' package")
+        self.cache_seconds = cache_seconds
+        self.retry_seconds = min(retry_seconds, cache_seconds)
+        self._families = []
+        self._next_refresh = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(
+                host=os.environ.get("DB_HOST", "localhost"),
+                port=os.environ.get("DB_PORT", "5432"),
+                dbname=os.environ.get("DB_NAME", "covid_database"),
+                user=os.environ.get("DB_USER", "postgres"),
+                password=os.environ.get("DB_PASSWORD", ""),
+                connect_timeout=5,
+            )
+            self._conn.autocommit = True
+        return self._conn
+
+    def _query(self):
+        with self._connection().cursor() as cursor:
+            cursor.execute(TOTALS_QUERY)
+            columns = [column.name for column in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+    def refresh(self):
+        start = time.perf_counter()
+        try:
+            totals = self._query()
+        except Exception as e:
+            print(f"Error querying totals: {e}")
+            collect_errors.set(1)
+            if self._conn is not None:
+                self._conn.close()
+            return False
+        finally:
+            collect_duration.observe(time.perf_counter() - start)
+
+        families = [
+            build_family(name, documentation, totals[totals["metric"] == metric])
+            for metric, (name, documentation) in FAMILIES.items()
+        ]
+        self._families = families
+        collect_errors.set(0)
+        return True
+
+    def describe(self):
+        # Without this, REGISTRY.register would call collect() and query the
+        # database before the HTTP server is even started.
+        return []
+
+    def collect(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._next_refresh is None or now >= self._next_refresh:
+                refreshed = self.refresh()
+                self._next_refresh = now + (self.cache_seconds if refreshed else self.retry_seconds)
+            families = self._families
+        yield from families
+
+
+def max_rss_bytes():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
 
-def update_metrics():
-    load_cases_and_deaths()
-    load_vaccinations()
 
 if __name__ == '__main__':
+    if SOURCE == "db":
+        REGISTRY.register(DatabaseCollector())
+        start_http_server(9100)
+        while True:
+            resident_memory.set(max_rss_bytes())
+            time.sleep(REFRESH_INTERVAL)
+
+    collector = CovidCollector()
+    REGISTRY.register(collector)
     start_http_server(9100)
     while True:
-        update_metrics()
-        time.sleep(60)
+        start = time.perf_counter()
+        changed = collector.refresh()
+        resident_memory.set(max_rss_bytes())
+        print(
+            f"Refresh {'rebuilt' if changed else 'kept'} metrics in {time.perf_counter() - start:.2f}s, "
+            f"max RSS {max_rss_bytes() / 2**20:.0f} MiB"
+        )
+        time.sleep(REFRESH_INTERVAL)
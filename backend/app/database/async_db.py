@@ -0,0 +1,76 @@
+import re
+
+import asyncpg
+import pandas as pd
+
+from common.config import logger
+from common.errors import ErrorCode
+from common.settings import database_settings
+from common.utils import frame_from_rows
+
+_PLACEHOLDER = re.compile(r"%(s|%)")
+
+_pool: asyncpg.Pool | None = None
+
+
+def to_asyncpg(query: str) -> str:
+    """Rewrite psycopg2 ``%s`` placeholders into asyncpg ``$n`` ones."""
+    counter = 0
+
+    def replace(match):
+        nonlocal counter
+        if match.group(1) == "%":
+            return "%"
+        counter += 1
+        return f"${counter}"
+
+    return _PLACEHOLDER.sub(replace, query)
+
+
+async def init_async_pool():
+    global _pool
+    if _pool is None:
+        _pool = await asyncpg.create_pool(
+            host=database_settings.DB_HOST,
+            port=int(database_settings.DB_PORT),
+            database=database_settings.DB_NAME,
+            user=database_settings.DB_USER,
+            password=database_settings.DB_PASSWORD,
+            min_size=database_settings.DB_POOL_MIN_SIZE,
+            max_size=database_settings.DB_POOL_MAX_SIZE,
+            # asyncpg has no maximum connection age; DB_POOL_MAX_LIFETIME only
+            # applies to the psycopg2 pool. Idle connections are closed instead.
+            max_inactive_connection_lifetime=database_settings.DB_POOL_MAX_IDLE,
+        )
+        logger.info("Async database pool initialised")
+    return _pool
+
+
+async def close_async_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def _fetch(query: str, params: tuple = None):
+    try:
+        pool = await init_async_pool()
+        async with pool.acquire(timeout=database_settings.DB_POOL_TIMEOUT) as conn:
+            return await conn.fetch(to_asyncpg(query), *(params or ()))
+    except TimeoutError as e:
+        logger.error(f"Async database pool exhausted: {e}")
+        ErrorCode.SERVICE_UNAVAILABLE.raise_exception()
+    except Exception as e:
+        logger.error(f"Database query error: {e}")
+        ErrorCode.DATABASE_ERROR.raise_exception()
+
+
+async def query_db_async(query: str, params: tuple = None):
+    return [dict(row) for row in await _fetch(query, params)]
+
+
+async def query_frame_async(query: str, params: tuple = None) -> pd.DataFrame:
+    """Run ``query`` and return the result as a column-oriented DataFrame."""
+    rows = await _fetch(query, params)
+    return frame_from_rows(list(rows[0].keys()) if rows else [], rows)
@@ -1,52 +1,70 @@
-import psycopg2
+import threading
+
 from psycopg2.extras import RealDictCursor
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
 from common.config import logger
 from common.errors import ErrorCode
 from common.settings import database_settings
-from database.models import Base
-from database.setup_db import load_data
+from database.pool import ConnectionPool, PoolTimeout
 
 
 engine = create_engine(database_settings.uri)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    _pool = ConnectionPool(
+                        min_size=database_settings.DB_POOL_MIN_SIZE,
+                        max_size=database_settings.DB_POOL_MAX_SIZE,
+                        timeout=database_settings.DB_POOL_TIMEOUT,
+                        max_lifetime=database_settings.DB_POOL_MAX_LIFETIME,
+                        health_check_interval=database_settings.DB_POOL_HEALTH_CHECK_INTERVAL,
+                        host=database_settings.DB_HOST,
+                        port=database_settings.DB_PORT,
+                        database=database_settings.DB_NAME,
+                        user=database_settings.DB_USER,
+                        password=database_settings.DB_PASSWORD,
+                        cursor_factory=RealDictCursor
+                    )
+                except Exception as e:
+                    logger.error(f"Database connection error: {e}")
+                    ErrorCode.DATABASE_ERROR.raise_exception()
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
 def get_db_connection():
-    try:
-        return psycopg2.connect(
-            host=database_settings.DB_HOST,
-            port=database_settings.DB_PORT,
-            database=database_settings.DB_NAME,
-            user=database_settings.DB_USER,
-            password=database_settings.DB_PASSWORD,
-            cursor_factory=RealDictCursor
-        )
-    except Exception as e:
-        logger.error(f"Database connection error: {e}")
-        ErrorCode.DATABASE_ERROR.raise_exception()
+    return get_pool().connection()
 
 
 def query_db(query: str, params: tuple = None):
     try:
         with get_db_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(query, params)
-                return cursor.fetchall()
+            with conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    return cursor.fetchall()
+    except PoolTimeout as e:
+        logger.error(f"Database pool exhausted: {e}")
+        ErrorCode.SERVICE_UNAVAILABLE.raise_exception()
     except Exception as e:
         logger.error(f"Database query error: {e}")
         ErrorCode.DATABASE_ERROR.raise_exception()
 
-
-def setup_database():
-    try:
-        Base.metadata.create_all(bind=engine)
-
-        with SessionLocal() as session:
-            load_data(session)
-
-        logger.info("Database setup and data loading completed successfully.")
-    except Exception as e:
-        logger.error(f"Error during database setup: {e}")
-        ErrorCode.DATABASE_ERROR.raise_exception()
@@ -0,0 +1,197 @@
+import csv
+import io
+import uuid
+from typing import Optional
+
+import orjson
+import psycopg2.extensions
+from fastapi.concurrency import run_in_threadpool
+
+from common.config import logger
+from common.errors import ErrorCode
+from common.monitoring import EXPORT_ROWS, EXPORT_ACTIVE
+from database.db_connect import get_db_connection
+from database.pool import PoolTimeout
+from database.queries import country_filter, keyset_columns, keyset_filter
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+class NDJSONWriter:
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def __init__(self, columns, type_codes):
+        self.columns = columns
+
+    def header(self) -> bytes:
+        return b""
+
+    def batch(self, rows) -> bytes:
+        columns = self.columns
+        return b"".join(orjson.dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class CSVWriter:
+    media_type = "text/csv"
+    extension = "csv"
+
+    def __init__(self, columns, type_codes):
+        self.columns = columns
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def header(self) -> bytes:
+        self._writer.writerow(self.columns)
+        return self._drain()
+
+    def batch(self, rows) -> bytes:
+        self._writer.writerows(rows)
+        return self._drain()
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class ArrowWriter:
+    """Arrow IPC stream; the schema comes from the Postgres column types so
+    every batch matches it even when a column is all nulls in the first one."""
+    media_type = "application/vnd.apache.arrow.stream"
+    extension = "arrows"
+
+    def __init__(self, columns, type_codes):
+        if pa is None:
+            raise RuntimeError("Arrow export requires the optional 'pyarrow' package")
+        oid_types = {
+            16: pa.bool_(), 20: pa.int64(), 21: pa.int16(), 23: pa.int32(),
+            700: pa.float32(), 701: pa.float64(), 1082: pa.date32(),
+            1114: pa.timestamp("us"), 1184: pa.timestamp("us", tz="UTC"),
+        }
+        self.schema = pa.schema([
+            (name, oid_types.get(type_code, pa.string()))
+            for name, type_code in zip(columns, type_codes)
+        ])
+        self._buffer = io.BytesIO()
+        self._writer = None
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def header(self) -> bytes:
+        self._writer = pa.ipc.new_stream(self._buffer, self.schema)
+        return self._drain()
+
+    def batch(self, rows) -> bytes:
+        if not rows:
+            return b""
+        arrays = [
+            pa.array(values, type=field.type)
+            for values, field in zip(zip(*rows), self.schema)
+        ]
+        self._writer.write_batch(pa.record_batch(arrays, schema=self.schema))
+        return self._drain()
+
+    def footer(self) -> bytes:
+        self._writer.close()
+        return self._drain()
+
+
+WRITERS = {"ndjson": NDJSONWriter, "csv": CSVWriter, "arrow": ArrowWriter}
+
+
+def export_query(table_name: str, country: Optional[str] = None, after: Optional[tuple] = None):
+    """Full-table query in primary key order, optionally resuming after a key."""
+    key = keyset_columns(table_name)
+    conditions, params = [], []
+    for condition, condition_params in (country_filter(table_name, country), keyset_filter(key, after)):
+        if condition:
+            conditions.append(condition)
+            params.extend(condition_params)
+
+    where_sql = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    query = f"SELECT * FROM public.{table_name} {where_sql} ORDER BY {', '.join(key)}"
+    return query, tuple(params)
+
+
+def _stream(table_name: str, fmt: str, query: str, params: tuple, batch_size: int):
+    with get_db_connection() as conn:
+        with conn:
+            # A named cursor keeps the result set on the server; only one
+            # batch is ever held in memory here.
+            with conn.cursor(
+                name=f"export_{uuid.uuid4().hex}",
+                cursor_factory=psycopg2.extensions.cursor
+            ) as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(query, params)
+                rows = cursor.fetchmany(batch_size)
+                writer = WRITERS[fmt](
+                    [column.name for column in cursor.description],
+                    [column.type_code for column in cursor.description]
+                )
+                yield writer.header() + writer.batch(rows)
+
+                while rows:
+                    EXPORT_ROWS.labels(table=table_name, format=fmt).inc(len(rows))
+                    rows = cursor.fetchmany(batch_size)
+                    if rows:
+                        yield writer.batch(rows)
+                yield writer.footer()
+
+
+async def open_export(table_name: str, fmt: str, query: str, params: tuple, batch_size: int):
+    """Start an export and return ``(writer class, async chunk iterator)``.
+
+    The query runs and its first batch is fetched before this returns, so
+    pool exhaustion and database errors still surface as HTTP errors.
+    Blocking fetches run in the threadpool, and the cursor and connection
+    are released when the client disconnects.
+    """
+    if fmt == "arrow" and pa is None:
+        logger.error("Arrow export requested but pyarrow is not installed")
+        ErrorCode.INVALID_INPUT.raise_exception()
+
+    chunks = _stream(table_name, fmt, query, params, batch_size)
+    EXPORT_ACTIVE.inc()
+    try:
+        first = await run_in_threadpool(next, chunks)
+    except PoolTimeout as e:
+        EXPORT_ACTIVE.dec()
+        logger.error(f"Database pool exhausted: {e}")
+        ErrorCode.SERVICE_UNAVAILABLE.raise_exception()
+    except Exception as e:
+        EXPORT_ACTIVE.dec()
+        logger.error(f"Export of {table_name} failed: {e}")
+        ErrorCode.DATABASE_ERROR.raise_exception()
+
+    async def iterate():
+        try:
+            yield first
+            while True:
+                chunk = await run_in_threadpool(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        except Exception as e:
+            logger.error(f"Export of {table_name} aborted: {e}")
+            raise
+        finally:
+            await run_in_threadpool(chunks.close)
+            EXPORT_ACTIVE.dec()
+
+    return WRITERS[fmt], iterate()
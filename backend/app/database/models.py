@@ -1,5 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Float, Date, DateTime,
+    Index, PrimaryKeyConstraint, func, text
+)
+from sqlalchemy.orm import declarative_base, declared_attr
 from datetime import datetime, timezone
 
 Base = declarative_base()
@@ -37,8 +40,8 @@ class Covid19Vaccine(Base):
 
 
 class CoronavirusBaseMixin:
-    id = Column(Integer, primary_key=True)
-    date = Column(Date)
+    id = Column(Integer, autoincrement=True, nullable=False)
+    date = Column(Date, nullable=False)
     province = Column(String)
     country = Column(String)
     lat = Column(Float)
@@ -54,25 +57,50 @@ class CoronavirusBaseMixin:
     continent_name = Column(String)
     continent_code = Column(String)
 
+    @declared_attr
+    def __table_args__(cls):
+        return (PrimaryKeyConstraint("date", "id"),)
+
 
 class CoronavirusDaily(Base, CoronavirusBaseMixin):
+    """Parent of the yearly tables, range-partitioned by date.
+
+    Indexes declared here are created on every partition by Postgres.
+    """
     __tablename__ = "coronavirus_daily"
+    __table_args__ = (
+        PrimaryKeyConstraint("date", "id"),
+        Index(
+            "ix_coronavirus_daily_country_type_date",
+            func.lower(text("country")), "type", "date",
+            postgresql_include=["cases"]
+        ),
+        Index("ix_coronavirus_daily_type_date", "type", "date", postgresql_include=["cases"]),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
 
 
 class Coronavirus2020(Base, CoronavirusBaseMixin):
     __tablename__ = "coronavirus_2020"
+    partition_bounds = ("2020-01-01", "2021-01-01")
 
 
 class Coronavirus2021(Base, CoronavirusBaseMixin):
     __tablename__ = "coronavirus_2021"
+    partition_bounds = ("2021-01-01", "2022-01-01")
 
 
 class Coronavirus2022(Base, CoronavirusBaseMixin):
     __tablename__ = "coronavirus_2022"
+    partition_bounds = ("2022-01-01", "2023-01-01")
 
 
 class Coronavirus2023(Base, CoronavirusBaseMixin):
     __tablename__ = "coronavirus_2023"
+    partition_bounds = ("2023-01-01", "2024-01-01")
+
+
+CORONAVIRUS_PARTITIONS = [Coronavirus2020, Coronavirus2021, Coronavirus2022, Coronavirus2023]
 
 class User(Base):
     __tablename__ = 'users'
@@ -81,3 +109,60 @@ class User(Base):
     email = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class DataLoadManifest(Base):
+    __tablename__ = "data_load_manifest"
+    id = Column(Integer, primary_key=True)
+    path = Column(String, unique=True, nullable=False)
+    table_name = Column(String, nullable=False)
+    checksum = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    mtime = Column(Float, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    loaded_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class CoronavirusCountryRollup(Base):
+    """SUM(cases) per country, day and type, maintained by the data loader."""
+    __tablename__ = "coronavirus_country_rollup"
+    country = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True)
+    type = Column(String, primary_key=True)
+    cases = Column(BigInteger)
+
+    __table_args__ = (
+        Index(
+            "ix_coronavirus_country_rollup_country_type_date",
+            func.lower(text("country")), "type", "date",
+            postgresql_include=["cases"]
+        ),
+    )
+
+
+class CoronavirusGlobalRollup(Base):
+    """SUM(cases) per day and type across all countries, maintained by the data loader."""
+    __tablename__ = "coronavirus_global_rollup"
+    date = Column(Date, primary_key=True)
+    type = Column(String, primary_key=True)
+    cases = Column(BigInteger)
+
+
+class CoronavirusLocationRollup(Base):
+    """SUM(cases) per partition, location and type, maintained by the data loader."""
+    __tablename__ = "coronavirus_location_rollup"
+    period_start = Column(Date, primary_key=True)
+    country = Column(String, primary_key=True)
+    lat = Column(Float, primary_key=True)
+    long = Column(Float, primary_key=True)
+    type = Column(String, primary_key=True)
+    cases = Column(BigInteger)
+
+
+class VaccineLocationRollup(Base):
+    """Highest people_at_least_one_dose per location, maintained by the data loader."""
+    __tablename__ = "covid19_vaccine_location_rollup"
+    country = Column(String, primary_key=True)
+    lat = Column(Float, primary_key=True)
+    long = Column(Float, primary_key=True)
+    people_at_least_one_dose = Column(Float)
@@ -0,0 +1,188 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from common.config import logger
+from common.monitoring import (
+    DB_POOL_SIZE, DB_POOL_MAX_SIZE, DB_POOL_WAITING,
+    DB_POOL_ACQUIRE_DURATION, DB_POOL_ACQUIRE_TIMEOUTS, DB_POOL_RECYCLED
+)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of psycopg2 connections.
+
+    Connections are created lazily up to ``max_size``. Callers block for at
+    most ``timeout`` seconds when the pool is saturated. Connections older than
+    ``max_lifetime`` are recycled, and connections idle for longer than
+    ``health_check_interval`` are pinged before being handed out.
+    """
+
+    def __init__(self, min_size: int, max_size: int, timeout: float, max_lifetime: float,
+                 health_check_interval: float, **connect_kwargs):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size bounds")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self._connect_kwargs = connect_kwargs
+
+        self._idle = deque()
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        DB_POOL_MAX_SIZE.set(max_size)
+        for _ in range(min_size):
+            self._idle.append(self._open())
+            self._size += 1
+        self._report()
+
+    def _open(self) -> _PooledConnection:
+        return _PooledConnection(psycopg2.connect(**self._connect_kwargs))
+
+    def _report(self):
+        DB_POOL_SIZE.labels(state="idle").set(len(self._idle))
+        DB_POOL_SIZE.labels(state="in_use").set(self._size - len(self._idle))
+        DB_POOL_WAITING.set(self._waiting)
+
+    def _discard(self, pooled: _PooledConnection, reason: str):
+        DB_POOL_RECYCLED.labels(reason=reason).inc()
+        try:
+            pooled.conn.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled connection: {e}")
+
+    def _is_usable(self, pooled: _PooledConnection) -> bool:
+        now = time.monotonic()
+        if pooled.conn.closed:
+            self._discard(pooled, "closed")
+            return False
+        if now - pooled.created_at > self.max_lifetime:
+            self._discard(pooled, "max_lifetime")
+            return False
+        if now - pooled.last_used > self.health_check_interval:
+            try:
+                with pooled.conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                pooled.conn.rollback()
+            except Exception as e:
+                logger.warning(f"Pooled connection failed health check: {e}")
+                self._discard(pooled, "health_check")
+                return False
+        return True
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._report()
+            self._cond.notify()
+
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+
+        while True:
+            pooled = None
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    # Only callers actually blocked on the condition count as waiting.
+                    self._waiting += 1
+                    self._report()
+                    try:
+                        notified = remaining > 0 and self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                    if not notified and not self._idle and self._size >= self.max_size:
+                        DB_POOL_ACQUIRE_TIMEOUTS.inc()
+                        self._report()
+                        raise PoolTimeout(
+                            f"No database connection available within {self.timeout}s"
+                        )
+
+                if self._idle:
+                    pooled = self._idle.pop()
+                else:
+                    self._size += 1
+                self._report()
+
+            if pooled is None:
+                try:
+                    pooled = self._open()
+                except Exception:
+                    self._release_slot()
+                    raise
+            elif not self._is_usable(pooled):
+                self._release_slot()
+                continue
+
+            DB_POOL_ACQUIRE_DURATION.observe(time.monotonic() - start)
+            return pooled
+
+    def putconn(self, pooled: _PooledConnection, discard: bool = False):
+        if not discard and not pooled.conn.closed:
+            try:
+                if pooled.conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    pooled.conn.rollback()
+            except Exception as e:
+                logger.warning(f"Failed to reset pooled connection: {e}")
+                discard = True
+
+        if discard or pooled.conn.closed or self._closed:
+            reason = "error" if discard else "closed" if pooled.conn.closed else "shutdown"
+            self._discard(pooled, reason)
+            self._release_slot()
+            return
+
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._report()
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        pooled = self.getconn()
+        discard = False
+        try:
+            yield pooled.conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.putconn(pooled, discard=discard)
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._report()
+            self._cond.notify_all()
+        for pooled in idle:
+            self._discard(pooled, "shutdown")
@@ -0,0 +1,131 @@
+import base64
+import binascii
+from datetime import date
+from typing import List, Optional
+
+import orjson
+
+from database.models import Base
+
+# Ordering that matches each table's primary key, so scans in this order are
+# index-served and can resume after the last key seen.
+KEYSET_COLUMNS = {
+    "covid19_vaccine": ("id",),
+    "world_population": ("id",),
+}
+
+COUNTRY_COLUMNS = {
+    "covid19_vaccine": "country_region",
+    "world_population": "country_name",
+}
+
+
+def keyset_columns(table_name: str) -> tuple:
+    if table_name.startswith("coronavirus_"):
+        return ("date", "id")
+    return KEYSET_COLUMNS[table_name]
+
+
+LIKE_WILDCARDS = ("%", "_")
+
+
+def exact_match_values(table_name: str, country: Optional[str], types=()) -> list:
+    """Filter values matched exactly rather than with ILIKE: the country on the
+    coronavirus tables (case-insensitively, so the lower(country) index
+    applies) and case types."""
+    values = list(types or ())
+    if country and table_name.startswith("coronavirus_"):
+        values.append(country)
+    return values
+
+
+def has_wildcards(values) -> bool:
+    return any(wildcard in value for value in values for wildcard in LIKE_WILDCARDS)
+
+
+def country_filter(table_name: str, country: Optional[str]):
+    """Return the WHERE condition and parameters restricting ``table_name`` to ``country``."""
+    if not country:
+        return None, ()
+    if table_name.startswith("coronavirus_"):
+        return "lower(country) = lower(%s)", (country,)
+    if table_name in COUNTRY_COLUMNS:
+        return f"{COUNTRY_COLUMNS[table_name]} ILIKE %s", (country,)
+    return None, ()
+
+
+def keyset_filter(columns: tuple, after: Optional[tuple]):
+    """Return the condition selecting rows strictly after the key ``after``."""
+    if not after:
+        return None, ()
+    placeholders = ", ".join(["%s"] * len(columns))
+    return f"({', '.join(columns)}) > ({placeholders})", tuple(after)
+
+
+def parse_key(table_name: str, value: str) -> tuple:
+    """Parse a comma-separated key such as ``2021-03-04,1234`` for ``table_name``.
+
+    Raises ValueError when the value does not match the table's key columns.
+    """
+    parts = value.split(",")
+    columns = keyset_columns(table_name)
+    if len(parts) != len(columns):
+        raise ValueError(f"Expected {len(columns)} key values for {table_name}")
+    return tuple(
+        date.fromisoformat(part) if column == "date" else int(part)
+        for column, part in zip(columns, parts)
+    )
+
+
+def table_columns(table_name: str) -> List[str]:
+    return list(Base.metadata.tables[table_name].columns.keys())
+
+
+def encode_cursor(table_name: str, key: tuple) -> str:
+    """Opaque pagination token for the page following the row with ``key``."""
+    payload = orjson.dumps([table_name, [str(value) for value in key]])
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(table_name: str, token: str) -> tuple:
+    """Inverse of ``encode_cursor``; raises ValueError for malformed or foreign tokens."""
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor_table, parts = orjson.loads(payload)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Malformed cursor: {e}")
+    if cursor_table != table_name or not isinstance(parts, list):
+        raise ValueError(f"Cursor does not belong to {table_name}")
+    return parse_key(table_name, ",".join(str(part) for part in parts))
+
+
+def page_query(table_name: str, fields: Optional[List[str]] = None, country: Optional[str] = None,
+               start_date: Optional[date] = None, end_date: Optional[date] = None,
+               after: Optional[tuple] = None, limit: int = 100):
+    """Build a keyset-paginated query over ``table_name``.
+
+    Only ``fields`` are selected, plus the key columns needed to build the
+    next cursor. One row more than ``limit`` is fetched to tell whether
+    another page follows.
+    """
+    key = keyset_columns(table_name)
+    if fields:
+        select_sql = ", ".join(list(fields) + [column for column in key if column not in fields])
+    else:
+        select_sql = "*"
+
+    conditions, params = [], []
+    for condition, condition_params in (
+        country_filter(table_name, country),
+        ("date >= %s", (start_date,)) if start_date else (None, ()),
+        ("date <= %s", (end_date,)) if end_date else (None, ()),
+        keyset_filter(key, after),
+    ):
+        if condition:
+            conditions.append(condition)
+            params.extend(condition_params)
+
+    where_sql = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    query = f"SELECT {select_sql} FROM public.{table_name} {where_sql} ORDER BY {', '.join(key)} LIMIT %s"
+    params.append(limit + 1)
+    return query, tuple(params)
@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database.models import (
+    CoronavirusCountryRollup, CoronavirusGlobalRollup, CoronavirusLocationRollup,
+    Covid19Vaccine, VaccineLocationRollup, CORONAVIRUS_PARTITIONS
+)
+
+COUNTRY_ROLLUP = CoronavirusCountryRollup.__tablename__
+GLOBAL_ROLLUP = CoronavirusGlobalRollup.__tablename__
+LOCATION_ROLLUP = CoronavirusLocationRollup.__tablename__
+VACCINE_ROLLUP = VaccineLocationRollup.__tablename__
+
+PARTITION_BOUNDS = {
+    model.__tablename__: tuple(date.fromisoformat(bound) for bound in model.partition_bounds)
+    for model in CORONAVIRUS_PARTITIONS
+}
+
+
+def partitions_between(start: date, end: date) -> List[str]:
+    """Yearly tables overlapping ``start``..``end`` (inclusive), oldest first."""
+    return [
+        table_name
+        for table_name, (lower, upper) in sorted(PARTITION_BOUNDS.items(), key=lambda item: item[1])
+        if lower <= end and start < upper
+    ]
+
+
+def period_start(day: date, resolution: str) -> date:
+    """First day of the ``rollup_query`` period containing ``day``."""
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    return day
+
+
+def refresh_rollups(session: Session, model):
+    """Rebuild the rollup rows covering ``model``'s partition range."""
+    start, end = model.partition_bounds
+    bounds = {"start": start, "end": end}
+
+    for rollup in (COUNTRY_ROLLUP, GLOBAL_ROLLUP):
+        session.execute(text(f"DELETE FROM {rollup} WHERE date >= :start AND date < :end"), bounds)
+    session.execute(text(f"DELETE FROM {LOCATION_ROLLUP} WHERE period_start = :start"), bounds)
+
+    session.execute(text(f"""
+        INSERT INTO {COUNTRY_ROLLUP} (country, date, type, cases)
+        SELECT country, date, type, SUM(cases)
+        FROM {model.__tablename__}
+        WHERE country IS NOT NULL AND type IS NOT NULL
+        GROUP BY country, date, type
+    """))
+    session.execute(text(f"""
+        INSERT INTO {GLOBAL_ROLLUP} (date, type, cases)
+        SELECT date, type, SUM(cases)
+        FROM {model.__tablename__}
+        WHERE type IS NOT NULL
+        GROUP BY date, type
+    """))
+    session.execute(text(f"""
+        INSERT INTO {LOCATION_ROLLUP} (period_start, country, lat, long, type, cases)
+        SELECT :start, country, lat, long, type, SUM(cases)
+        FROM {model.__tablename__}
+        WHERE country IS NOT NULL AND lat IS NOT NULL AND long IS NOT NULL AND type IS NOT NULL
+        GROUP BY country, lat, long, type
+    """), bounds)
+
+
+def refresh_vaccine_rollup(session: Session):
+    session.execute(text(f"DELETE FROM {VACCINE_ROLLUP}"))
+    session.execute(text(f"""
+        INSERT INTO {VACCINE_ROLLUP} (country, lat, long, people_at_least_one_dose)
+        SELECT country_region, lat, long, MAX(people_at_least_one_dose)
+        FROM {Covid19Vaccine.__tablename__}
+        WHERE country_region IS NOT NULL AND lat IS NOT NULL AND long IS NOT NULL
+            AND people_at_least_one_dose IS NOT NULL
+        GROUP BY country_region, lat, long
+    """))
+
+
+def rollups_missing(session: Session, model) -> bool:
+    if model is Covid19Vaccine:
+        return not session.execute(text(f"SELECT EXISTS (SELECT 1 FROM {VACCINE_ROLLUP})")).scalar()
+
+    start, end = model.partition_bounds
+    return not session.execute(
+        text(f"""
+            SELECT EXISTS (SELECT 1 FROM {GLOBAL_ROLLUP} WHERE date >= :start AND date < :end)
+                AND EXISTS (SELECT 1 FROM {LOCATION_ROLLUP} WHERE period_start = :start)
+        """),
+        {"start": start, "end": end}
+    ).scalar()
+
+
+def rollup_query(table_name: str, country: Optional[str] = None, types: Optional[List[str]] = None,
+                 by_type: bool = True, resolution: str = "day"):
+    """Build a ``SUM(cases)`` per day query for a coronavirus table from the rollups.
+
+    Returns ``date, type, cases`` rows when ``by_type`` is set, otherwise
+    ``date, cases`` rows summed over all types. With a ``week`` or ``month``
+    resolution ``date`` is the first day of the period and ``cases`` its sum.
+    """
+    where_clauses = []
+    params = []
+
+    if country:
+        rollup = COUNTRY_ROLLUP
+        where_clauses.append("lower(country) = lower(%s)")
+        params.append(country)
+    else:
+        rollup = GLOBAL_ROLLUP
+
+    if table_name in PARTITION_BOUNDS:
+        where_clauses.append("date >= %s AND date < %s")
+        params.extend(PARTITION_BOUNDS[table_name])
+
+    if types:
+        where_clauses.append("type = ANY(%s)")
+        params.append(list(types))
+
+    where_sql = ("WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
+    date_sql = "date" if resolution == "day" else f"date_trunc('{resolution}', date)::date AS date"
+    group_by = "1, type" if by_type else "1"
+
+    query = f"""
+        SELECT {date_sql}{", type" if by_type else ""}, SUM(cases)::bigint AS cases
+        FROM public.{rollup}
+        {where_sql}
+        GROUP BY {group_by}
+        ORDER BY {group_by}
+    """
+    return query, tuple(params)
@@ -1,34 +1,114 @@
-from sqlalchemy import create_engine
+import argparse
+import asyncio
+import hashlib
+import io
+import os
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, text, Integer, Float
 from sqlalchemy.orm import sessionmaker, Session
 from database.models import (
     Base, WorldPopulation, Covid19Vaccine, CoronavirusDaily,
-    Coronavirus2020, Coronavirus2021, Coronavirus2022, Coronavirus2023
+    Coronavirus2020, Coronavirus2021, Coronavirus2022, Coronavirus2023,
+    CORONAVIRUS_PARTITIONS, DataLoadManifest
 )
-from common.settings import database_settings
+from database.rollups import refresh_rollups, refresh_vaccine_rollup, rollups_missing
+from database.versions import VERSION_QUERY, publish_versions, versions_from_manifest
+from common.settings import database_settings, settings
 import pandas as pd
 
 engine = create_engine(database_settings.uri)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+CHUNK_SIZE = 50_000
+
+
+def drop_legacy_coronavirus_tables(connection):
+    """Drop a pre-partitioning coronavirus_daily and its yearly copies.
+
+    Their manifest entries are removed as well so the next load refills them.
+    """
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": f"public.{CoronavirusDaily.__tablename__}"}
+    ).scalar()
+    if relkind != "r":
+        return
+
+    tables = [CoronavirusDaily.__tablename__] + [m.__tablename__ for m in CORONAVIRUS_PARTITIONS]
+    print(f"Replacing unpartitioned {', '.join(tables)}")
+    connection.execute(text(f"DROP TABLE IF EXISTS {', '.join(tables)}"))
+    if connection.execute(text("SELECT to_regclass('public.data_load_manifest')")).scalar():
+        connection.execute(
+            text("DELETE FROM data_load_manifest WHERE table_name = ANY(:tables)"),
+            {"tables": tables}
+        )
+
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    partitions = {model.__table__ for model in CORONAVIRUS_PARTITIONS}
+    with engine.begin() as connection:
+        drop_legacy_coronavirus_tables(connection)
+        Base.metadata.create_all(
+            bind=connection,
+            tables=[t for t in Base.metadata.sorted_tables if t not in partitions]
+        )
+        for model in CORONAVIRUS_PARTITIONS:
+            start, end = model.partition_bounds
+            connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {model.__tablename__} "
+                f"PARTITION OF {CoronavirusDaily.__tablename__} "
+                f"FOR VALUES FROM ('{start}') TO ('{end}')"
+            ))
+
+
+def coerce_types(df, table, columns):
+    for name in columns:
+        column_type = table.columns[name].type
+        if isinstance(column_type, Integer):
+            df[name] = pd.to_numeric(df[name], errors="coerce").round().astype("Int64")
+        elif isinstance(column_type, Float):
+            df[name] = pd.to_numeric(df[name], errors="coerce")
+    return df
+
+
+def copy_chunk(cursor, table, columns, df):
+    buf = io.StringIO()
+    df.to_csv(buf, columns=columns, index=False, header=False, date_format="%Y-%m-%d")
+    buf.seek(0)
+    cursor.copy_expert(
+        f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+        buf
+    )
 
 
-def load_csv_to_db(session, model, path, parse_dates=None, lowercase_columns=True, transform_fn=None):
-    df = pd.read_csv(path, parse_dates=parse_dates, low_memory=False)
+def load_csv_to_db(session, model, path, parse_dates=None, lowercase_columns=True, transform_fn=None,
+                   chunksize=CHUNK_SIZE):
+    table = model.__table__
+    connection = session.connection().connection
+    start = time.perf_counter()
+    total = 0
 
-    if lowercase_columns:
-        df.columns = df.columns.str.lower().str.replace(" ", "_")
+    with connection.cursor() as cursor:
+        for df in pd.read_csv(path, parse_dates=parse_dates, low_memory=False, chunksize=chunksize):
+            if lowercase_columns:
+                df.columns = df.columns.str.lower().str.replace(" ", "_")
 
-    if transform_fn:
-        df = transform_fn(df)
+            if transform_fn:
+                df = transform_fn(df)
 
-    records = df.to_dict(orient="records")
-    session.bulk_insert_mappings(model, records)
-    session.commit()
-    print(f"Loaded {len(records)} rows into {model.__tablename__}")
-    return records
+            columns = [c.name for c in table.columns if c.name in df.columns]
+            copy_chunk(cursor, table, columns, coerce_types(df, table, columns))
+            total += len(df)
+
+    report_load(table.name, total, time.perf_counter() - start)
+    return total
+
+
+def report_load(table_name, rows, elapsed):
+    rate = rows / elapsed if elapsed else 0
+    print(f"Loaded {rows} rows into {table_name} in {elapsed:.2f}s ({rate:,.0f} rows/s)")
 
 
 def transform_world_population(df):
@@ -44,40 +124,114 @@ def transform_world_population(df):
     return df_long
 
 
-def load_data(session: Session):
-    load_csv_to_db(
-        session,
-        WorldPopulation,
-        'data/world_population.csv',
-        lowercase_columns=False,
-        transform_fn=transform_world_population
-    )
-
-    load_csv_to_db(
-        session,
-        Covid19Vaccine,
-        'data/covid19_vaccine.csv',
-        parse_dates=["date"]
-    )
-
-    corona_files = {
-        Coronavirus2020: 'data/coronavirus_2020.csv',
-        Coronavirus2021: 'data/coronavirus_2021.csv',
-        Coronavirus2022: 'data/coronavirus_2022.csv',
-        Coronavirus2023: 'data/coronavirus_2023.csv',
-    }
-
-    combined_records = []
-    for model, path in corona_files.items():
-        records = load_csv_to_db(
-            session,
-            model,
-            path,
-            parse_dates=["date"]
-        )
-        combined_records.extend(records)
-
-    if combined_records:
-        session.bulk_insert_mappings(CoronavirusDaily, combined_records)
+def file_checksum(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+DATA_SOURCES = [
+    (WorldPopulation, 'data/world_population.csv',
+     dict(lowercase_columns=False, transform_fn=transform_world_population)),
+    (Covid19Vaccine, 'data/covid19_vaccine.csv', dict(parse_dates=["date"])),
+    (Coronavirus2020, 'data/coronavirus_2020.csv', dict(parse_dates=["date"])),
+    (Coronavirus2021, 'data/coronavirus_2021.csv', dict(parse_dates=["date"])),
+    (Coronavirus2022, 'data/coronavirus_2022.csv', dict(parse_dates=["date"])),
+    (Coronavirus2023, 'data/coronavirus_2023.csv', dict(parse_dates=["date"])),
+]
+
+def load_source(session: Session, model, path, force=False, **load_kwargs):
+    """(Re)load ``path`` into ``model``'s table if it changed since the last load.
+
+    Returns True when the table was reloaded.
+    """
+    if not os.path.exists(path):
+        print(f"Skipping {model.__tablename__}: {path} not found")
+        return False
+
+    stat = os.stat(path)
+    entry = session.query(DataLoadManifest).filter_by(path=path).one_or_none()
+    if not force and entry and entry.size == stat.st_size and entry.mtime == stat.st_mtime:
+        print(f"Skipping {model.__tablename__}: {path} unchanged")
+        return False
+
+    checksum = file_checksum(path)
+    if not force and entry and entry.checksum == checksum:
+        entry.size, entry.mtime = stat.st_size, stat.st_mtime
         session.commit()
-        print(f"Loaded combined {len(combined_records)} rows into coronavirus_daily")
+        print(f"Skipping {model.__tablename__}: {path} unchanged (touched)")
+        return False
+
+    session.execute(text(f"TRUNCATE {model.__tablename__}"))
+    rows = load_csv_to_db(session, model, path, **load_kwargs)
+
+    if entry is None:
+        entry = DataLoadManifest(path=path)
+        session.add(entry)
+    entry.table_name = model.__tablename__
+    entry.checksum = checksum
+    entry.size, entry.mtime = stat.st_size, stat.st_mtime
+    entry.row_count = rows
+    entry.loaded_at = datetime.now(timezone.utc)
+
+    if model in CORONAVIRUS_PARTITIONS:
+        refresh_rollups(session, model)
+    elif model is Covid19Vaccine:
+        refresh_vaccine_rollup(session)
+    session.commit()
+    return True
+
+
+def load_data(session: Session, force: bool = False):
+    """Load every data source and return the names of the tables that were reloaded."""
+    reloaded_tables = []
+    for model, path, load_kwargs in DATA_SOURCES:
+        reloaded = load_source(session, model, path, force=force, **load_kwargs)
+        if reloaded:
+            reloaded_tables.append(model.__tablename__)
+
+        if reloaded or model not in (*CORONAVIRUS_PARTITIONS, Covid19Vaccine):
+            continue
+        if rollups_missing(session, model):
+            start = time.perf_counter()
+            if model is Covid19Vaccine:
+                refresh_vaccine_rollup(session)
+            else:
+                refresh_rollups(session, model)
+            session.commit()
+            print(f"Built rollups for {model.__tablename__} in {time.perf_counter() - start:.2f}s")
+
+    return reloaded_tables
+
+
+def announce_versions(session: Session, tables):
+    """Publish the new data versions of ``tables`` so API caches switch to fresh keys."""
+    versions = versions_from_manifest(session.execute(text(VERSION_QUERY)).all())
+    if any(model.__tablename__ in tables for model in CORONAVIRUS_PARTITIONS):
+        tables = [*tables, CoronavirusDaily.__tablename__]
+
+    try:
+        asyncio.run(publish_versions(settings.NATS_URL, {table: versions[table] for table in tables}))
+        print(f"Published new data versions for {', '.join(tables)}")
+    except Exception as e:
+        # Running services still pick the versions up from the manifest.
+        print(f"Could not publish data versions: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the schema and load new or changed CSV files")
+    parser.add_argument("--force", action="store_true", help="Reload every file even if it is unchanged")
+    args = parser.parse_args()
+
+    init_db()
+    with SessionLocal() as session:
+        reloaded_tables = load_data(session, force=args.force)
+        if reloaded_tables:
+            announce_versions(session, reloaded_tables)
+    print("Database setup and data loading completed successfully.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import json
+from collections import defaultdict
+
+from nats.aio.client import Client as NATS
+
+from common.config import logger
+from database.async_db import query_db_async
+from database.models import CoronavirusDaily, CORONAVIRUS_PARTITIONS
+
+VERSION_SUBJECT_PREFIX = "data.version"
+
+VERSION_QUERY = "SELECT table_name, path, checksum FROM data_load_manifest ORDER BY table_name, path"
+
+UNVERSIONED = "0"
+
+_versions = {}
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16]
+
+
+def versions_from_manifest(rows) -> dict:
+    """Map every loaded table to a version derived from the checksums of its files.
+
+    Reloading identical files keeps the version, so cached results survive.
+    The partitioned parent's version combines those of its partitions.
+    """
+    files = defaultdict(list)
+    for table_name, path, checksum in rows:
+        files[table_name].append(f"{path}:{checksum}")
+
+    versions = {table_name: _digest(*sorted(entries)) for table_name, entries in files.items()}
+    versions[CoronavirusDaily.__tablename__] = _digest(*(
+        versions.get(model.__tablename__, UNVERSIONED) for model in CORONAVIRUS_PARTITIONS
+    ))
+    return versions
+
+
+def data_version(table_name: str) -> str:
+    """Current data version of ``table_name`` as known to this process."""
+    return _versions.get(table_name, UNVERSIONED)
+
+
+def set_versions(versions: dict):
+    changed = {table: version for table, version in versions.items() if _versions.get(table) != version}
+    _versions.update(versions)
+    for table, version in changed.items():
+        logger.info(f"Data version of {table} is now {version}")
+    return changed
+
+
+async def refresh_versions():
+    rows = await query_db_async(VERSION_QUERY)
+    return set_versions(versions_from_manifest(
+        (row["table_name"], row["path"], row["checksum"]) for row in rows
+    ))
+
+
+async def keep_versions_fresh(interval: float):
+    """Re-read versions periodically in case a version event was missed."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await refresh_versions()
+        except Exception as e:
+            logger.error(f"Failed to refresh data versions: {e}")
+
+
+async def on_version_event(msg):
+    try:
+        payload = json.loads(msg.data.decode())
+        set_versions({payload["table"]: payload["version"]})
+    except Exception as e:
+        logger.error(f"Invalid data version event on {msg.subject}: {e}")
+
+
+async def publish_versions(nats_url: str, versions: dict):
+    """Announce new table versions on ``data.version.<table>``."""
+    nc = NATS()
+    await nc.connect(nats_url, connect_timeout=5, max_reconnect_attempts=0)
+    try:
+        for table, version in versions.items():
+            await nc.publish(
+                f"{VERSION_SUBJECT_PREFIX}.{table}",
+                json.dumps({"table": table, "version": version}).encode()
+            )
+        await nc.flush()
+    finally:
+        await nc.close()
@@ -1,27 +1,42 @@
-import io
+import asyncio
 import json
+from datetime import date
 
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
 import pandas as pd
 import plotly.graph_objs as go
 from fastapi import FastAPI, HTTPException, Query, Response, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from nats.aio.client import Client as NATS
 from nats.errors import TimeoutError, NoRespondersError
 from prometheus_client import make_asgi_app
 
 from auth import auth_router
-from common.cache import cache_get, cache_set, get_cache_key
+from common import codec, passwords
+from common.cache import get_cache_key, get_or_compute
 from common.config import logger
+from common.downsample import RESOLUTIONS, downsample_frame, downsample_series
 from common.errors import ErrorCode
+from common.http_cache import HTTPCacheMiddleware, http_cache
 from common.monitoring import monitor
-from common.settings import settings
-from common.utils import clean_data, CustomJSONEncoder
-from database.db_connect import setup_database, query_db
+from common.plotting import MEDIA_TYPES, plot_series, plotly_page, render_plot, shutdown_executor
+from common.settings import settings, database_settings, redis_settings
+from common.utils import clean_frame, frame_to_json, merge_sorted_frames
+from common.warmer import start_warmer, stop_warmer, track, warmable
+from database.async_db import init_async_pool, close_async_pool, query_frame_async
+from database.db_connect import close_pool
+from database.export import export_query, open_export
+from database.queries import (
+    country_filter, decode_cursor, encode_cursor, exact_match_values, has_wildcards, keyset_columns,
+    page_query, parse_key, table_columns
+)
+from database.rollups import PARTITION_BOUNDS, partitions_between, period_start, rollup_query
+from database.versions import (
+    VERSION_SUBJECT_PREFIX, data_version, keep_versions_fresh, on_version_event, refresh_versions
+)
 
 app = FastAPI()
 
@@ -50,6 +65,9 @@ async def startup_nats():
     await nc.subscribe("stats.events.*", cb=on_stats_event)
     logger.info("Subscribed to stats.events.*")
 
+    await nc.subscribe(f"{VERSION_SUBJECT_PREFIX}.*", cb=on_version_event)
+    logger.info(f"Subscribed to {VERSION_SUBJECT_PREFIX}.*")
+
 
 @app.on_event("shutdown")
 async def shutdown_nats():
@@ -60,16 +78,50 @@ async def shutdown_nats():
     except Exception as e:
         logger.error(f"Error shutting down NATS: {e}")
 
+    close_pool()
+    shutdown_executor()
+    passwords.shutdown_executor()
+
+
+@app.on_event("startup")
+async def startup_db():
+    await init_async_pool()
+    try:
+        await refresh_versions()
+    except Exception as e:
+        logger.error(f"Failed to load data versions: {e}")
+    app.state.version_refresher = asyncio.create_task(
+        keep_versions_fresh(redis_settings.CACHE_VERSION_REFRESH_INTERVAL)
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_db():
+    app.state.version_refresher.cancel()
+    await close_async_pool()
+
+
+@app.on_event("startup")
+async def startup_warmer():
+    start_warmer()
+
+
+@app.on_event("shutdown")
+async def shutdown_warmer():
+    await stop_warmer()
+
+# Added before CORS so 304 responses still carry the CORS headers.
+app.add_middleware(HTTPCacheMiddleware, router=app.router)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOW_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-setup_database()
-
 app.include_router(auth_router)
 
 ALLOWED_TABLES = [
@@ -83,9 +135,15 @@ PLOT_COLUMNS = [
 ]
 
 @monitor
-def build_query(table_name: str, column_name: Optional[str] = None, country: Optional[str] = None):
+def build_query(table_name: str, column_name: Optional[str] = None, country: Optional[str] = None,
+                resolution: str = "day"):
     is_corona_table = table_name.startswith("coronavirus_")
 
+    if is_corona_table and column_name == "cases":
+        # One row per period of the table's date range, so the whole series is
+        # plotted and max_points decides how much of it is drawn.
+        return rollup_query(table_name, country, by_type=False, resolution=resolution)
+
     if column_name:
         if is_corona_table:
             query = f"SELECT date, SUM({column_name}) as {column_name} FROM public.{table_name} "
@@ -94,20 +152,10 @@ def build_query(table_name: str, column_name: Optional[str] = None, country: Opt
     else:
         query = f"SELECT * FROM public.{table_name} "
 
-    if country:
-        if is_corona_table:
-            query += "WHERE country ILIKE %s "
-            params = (country,)
-        elif table_name == "covid19_vaccine":
-            query += "WHERE country_region ILIKE %s "
-            params = (country,)
-        elif table_name == "world_population":
-            query += "WHERE country_name ILIKE %s "
-            params = (country,)
-        else:
-            params = None
-    else:
-        params = None
+    condition, params = country_filter(table_name, country)
+    if condition:
+        query += f"WHERE {condition} "
+    params = params or None
 
     if column_name:
         if is_corona_table:
@@ -120,174 +168,332 @@ def build_query(table_name: str, column_name: Optional[str] = None, country: Opt
 
     return query, params
 
+def reject_patterns(table_name: str, country: Optional[str], types=()):
+    """Coronavirus country and type filters match exactly, so a LIKE pattern
+    that used to select several rows is refused instead of finding nothing."""
+    if has_wildcards(exact_match_values(table_name, country, types)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Country and type filters match exact names; '%' and '_' patterns are not supported"
+        )
+
 @monitor
-def fetch_and_cache_data(cache_key: str, query: str, params: Optional[tuple]):
-    cached_data = cache_get(cache_key)
-    if cached_data:
-        logger.info(f"Cache hit for {cache_key}")
-        return json.loads(cached_data.decode("utf-8"))
-
-    logger.info(f"Cache miss for {cache_key}")
-    data = query_db(query, params)
-    if not data:
-        ErrorCode.NOT_FOUND.raise_exception()
+async def fetch_and_cache_data(cache_key: str, query: str, params: Optional[tuple]):
+    async def compute():
+        df = await query_frame_async(query, params)
+        if df.empty:
+            ErrorCode.NOT_FOUND.raise_exception()
+        return clean_frame(df)
 
-    cleaned_data = clean_data(data)
-    cache_set(cache_key, json.dumps(cleaned_data, cls=CustomJSONEncoder))
-    return cleaned_data
+    return await get_or_compute(
+        cache_key, compute, encode=codec.encode, decode=codec.decode, ttl=redis_settings.CACHE_VERSIONED_TTL
+    )
 
+@app.get("/data/{table_name}")
+@http_cache(tables=lambda params: [params["table_name"]], max_age=60)
 @monitor
-def generate_plot(dates, values, column_name):
-    parsed_dates = []
-    for d in dates:
-        try:
-            parsed_dates.append(pd.to_datetime(d))
-        except Exception:
-            continue
+async def read_table_data(
+    table_name: str,
+    country: Optional[str] = Query(None, description="Filter by country"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    start_date: Optional[date] = Query(None, description="First date to include"),
+    end_date: Optional[date] = Query(None, description="Last date to include"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    if table_name not in ALLOWED_TABLES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid table name")
+    reject_patterns(table_name, country)
 
-    if not parsed_dates:
-        raise ValueError("No valid date values for plotting")
+    columns = table_columns(table_name)
+    selected = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip())) if fields else []
+    if any(field not in columns for field in selected):
+        ErrorCode.INVALID_INPUT.raise_exception()
+    if (start_date or end_date) and "date" not in columns:
+        ErrorCode.INVALID_INPUT.raise_exception()
 
-    plt.figure(figsize=(12, 6))
-    plt.plot(parsed_dates, values[:len(parsed_dates)], marker='o', linestyle='-', linewidth=2)
+    try:
+        after = decode_cursor(table_name, cursor) if cursor else None
+    except ValueError as e:
+        logger.error(f"Invalid cursor for {table_name}: {e}")
+        ErrorCode.INVALID_INPUT.raise_exception()
 
-    plt.xlabel("Date")
-    plt.ylabel(column_name.replace("_", " ").title())
-    plt.title(f"{column_name.replace('_', ' ').title()} Over Time")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+    cache_key = get_cache_key(
+        table_name, data_version(table_name), country or "all", ",".join(selected) or "*",
+        str(start_date or ""), str(end_date or ""), cursor or "", str(limit)
+    )
+    query, params = page_query(table_name, selected, country, start_date, end_date, after, limit)
+    df = await fetch_and_cache_data(cache_key, query, params)
+
+    # The cached frame holds one extra row and the key columns; trim both here.
+    page = df.iloc[:limit]
+    headers = {}
+    if len(df) > limit:
+        key = keyset_columns(table_name)
+        headers["X-Next-Cursor"] = encode_cursor(table_name, tuple(page[column].iloc[-1] for column in key))
+    if selected:
+        page = page[selected]
+    return Response(content=frame_to_json(page), media_type="application/json", headers=headers)
+
+@app.get("/export/{table_name}")
+@monitor
+async def export_table(
+    table_name: str,
+    format: Literal["ndjson", "csv", "arrow"] = Query("ndjson"),
+    country: Optional[str] = Query(None, description="Filter by country"),
+    batch_size: int = Query(database_settings.DB_EXPORT_BATCH_SIZE, ge=100, le=50000),
+    after: Optional[str] = Query(None, description="Resume after this key, e.g. 2021-03-04,1234 or 1234")
+):
+    if table_name not in ALLOWED_TABLES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid table name")
+    reject_patterns(table_name, country)
 
-    ax = plt.gca()
-    ax.xaxis.set_major_locator(mdates.AutoDateLocator())
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    try:
+        after_key = parse_key(table_name, after) if after else None
+    except ValueError as e:
+        logger.error(f"Invalid export key {after!r}: {e}")
+        ErrorCode.INVALID_INPUT.raise_exception()
 
-    buf = io.BytesIO()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
-    plt.close()
-    return buf.getvalue()
+    query, params = export_query(table_name, country, after_key)
+    writer, chunks = await open_export(table_name, format, query, params, batch_size)
+    return StreamingResponse(
+        chunks,
+        media_type=writer.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table_name}.{writer.extension}"'}
+    )
 
+async def fetch_segment(cache_key: str, query: str, params: tuple):
+    """One yearly segment of a range query; a year without rows is empty rather than a 404."""
+    try:
+        return await fetch_and_cache_data(cache_key, query, params)
+    except HTTPException as e:
+        if e.status_code != status.HTTP_404_NOT_FOUND:
+            raise
+        return None
 
-@app.get("/data/{table_name}")
+
+async def fetch_range(start: date, end: date, resolution: str, segment) -> pd.DataFrame:
+    """Fetch the yearly tables overlapping ``start``..``end`` in parallel and
+    merge their ``date, type, cases`` rows in date order.
+
+    ``segment(table_name)`` returns ``(cache_key, query, params)`` for a
+    whole year, so segments are shared with the single-year endpoints and
+    reloading one year leaves the cached segments of the others valid.
+    """
+    if start > end:
+        ErrorCode.INVALID_INPUT.raise_exception()
+    tables = partitions_between(start, end)
+    frames = await asyncio.gather(*(fetch_segment(*segment(table_name)) for table_name in tables))
+
+    lower, upper = period_start(start, resolution).isoformat(), end.isoformat()
+    frames = [
+        frame[(frame["date"] >= lower) & (frame["date"] <= upper)]
+        for frame in frames if frame is not None
+    ]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        ErrorCode.NOT_FOUND.raise_exception()
+    return merge_sorted_frames(frames, key=("date", "type"), value="cases")
+
+@app.get("/data/coronavirus_by_type/range")
+@http_cache(tables=lambda params: list(PARTITION_BOUNDS), max_age=60)
 @monitor
-def read_table_data(table_name: str, country: Optional[str] = Query(None, description="Filter by country")):
-    if table_name not in ALLOWED_TABLES:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid table name")
+async def get_cases_by_type_range(
+    start: date = Query(..., description="First date to include"),
+    end: date = Query(..., description="Last date to include"),
+    country: Optional[str] = Query(None, description="Exact country name, case-insensitive"),
+    resolution: Literal[RESOLUTIONS] = Query("day", description="Sum cases per day, week or month"),
+    max_points: Optional[int] = Query(None, ge=3, le=10000, description="Downsample each type to this many points")
+):
+    reject_patterns("coronavirus_daily", country)
+
+    def segment(table_name: str):
+        query, params = rollup_query(table_name, country, resolution=resolution)
+        cache_key = get_cache_key("cases_by_type", table_name, data_version(table_name), country or "all", resolution)
+        return cache_key, query, params
 
-    cache_key = get_cache_key(table_name, country or "all")
-    query, params = build_query(table_name, country=country)
-    return JSONResponse(content=fetch_and_cache_data(cache_key, query, params))
+    df = await fetch_range(start, end, resolution, segment)
+    return Response(content=frame_to_json(downsample_frame(df, max_points, by="type")), media_type="application/json")
 
 @app.get("/data/coronavirus_by_type/{year}")
+@http_cache(tables=lambda params: [f"coronavirus_{params['year']}"], max_age=60)
 @monitor
-def get_cases_by_type(year: str, country: Optional[str] = Query(None)):
+@warmable("cases_by_type")
+async def get_cases_by_type(
+    year: str,
+    country: Optional[str] = Query(None, description="Exact country name, case-insensitive"),
+    resolution: Literal[RESOLUTIONS] = Query("day", description="Sum cases per day, week or month"),
+    max_points: Optional[int] = Query(None, ge=3, le=10000, description="Downsample each type to this many points")
+):
     table_name = f"coronavirus_{year}"
     if table_name not in ALLOWED_TABLES:
         ErrorCode.INVALID_INPUT.raise_exception()
+    reject_patterns(table_name, country)
+    track("cases_by_type", year=year, country=country, resolution=resolution, max_points=max_points)
 
-    query = f"""
-        SELECT date, type, SUM(cases) AS cases
-        FROM public.{table_name}
-        {"WHERE country ILIKE %s" if country else ""}
-        GROUP BY date, type
-        ORDER BY date;
-    """
-    params = (country,) if country else None
-    cache_key = get_cache_key("cases_by_type", table_name, country or "all")
+    query, params = rollup_query(table_name, country, resolution=resolution)
+    cache_key = get_cache_key("cases_by_type", table_name, data_version(table_name), country or "all", resolution)
 
-    return fetch_and_cache_data(cache_key, query, params)
+    df = await fetch_and_cache_data(cache_key, query, params)
+    return Response(content=frame_to_json(downsample_frame(df, max_points, by="type")), media_type="application/json")
+
+@app.get("/plotly/compare_types/range", response_class=HTMLResponse)
+@http_cache(tables=lambda params: list(PARTITION_BOUNDS), max_age=300)
+@monitor
+async def plotly_compare_types_range(
+    start: date = Query(..., description="First date to include"),
+    end: date = Query(..., description="Last date to include"),
+    country: Optional[str] = Query(None, description="Exact country name, case-insensitive"),
+    type: Optional[List[str]] = Query(["confirmed", "death", "recovery"]),
+    output: Literal["html", "json"] = Query("html", description="Full page, or the figure spec for plotly.js"),
+    resolution: Literal[RESOLUTIONS] = Query("day", description="Sum cases per day, week or month"),
+    max_points: Optional[int] = Query(None, ge=3, le=10000, description="Downsample each type to this many points")
+):
+    reject_patterns("coronavirus_daily", country, type)
+    types = "_".join(sorted(type))
+    title = f"COVID-19 Cases {start} to {end}" + (f" ({country})" if country else "")
+
+    def segment(table_name: str):
+        query, params = rollup_query(table_name, country, type, resolution=resolution)
+        cache_key = get_cache_key("plotly", table_name, data_version(table_name), country or "all", types, resolution)
+        return cache_key, query, params
+
+    async def render():
+        df = downsample_frame(await fetch_range(start, end, resolution, segment), max_points, by="type")
+        return await run_in_threadpool(build_compare_types_figure, df, title)
+
+    versions = [data_version(table_name) for table_name in partitions_between(start, end)]
+    figure_json = await get_or_compute(
+        get_cache_key(
+            "plotly_range_figure", str(start), str(end), *versions, country or "all", types, resolution,
+            str(max_points or "")
+        ),
+        render, ttl=redis_settings.CACHE_VERSIONED_TTL
+    )
+    if output == "json":
+        return Response(content=figure_json, media_type="application/json")
+    return HTMLResponse(plotly_page(figure_json, title))
 
 @app.get("/plotly/compare_types/{year}", response_class=HTMLResponse)
+@http_cache(tables=lambda params: [f"coronavirus_{params['year']}"], max_age=300)
 @monitor
-def plotly_compare_types(
+async def plotly_compare_types(
     year: str,
-    country: Optional[str] = Query(None),
-    type: Optional[List[str]] = Query(["confirmed", "death", "recovery"])
+    country: Optional[str] = Query(None, description="Exact country name, case-insensitive"),
+    type: Optional[List[str]] = Query(["confirmed", "death", "recovery"]),
+    output: Literal["html", "json"] = Query("html", description="Full page, or the figure spec for plotly.js"),
+    resolution: Literal[RESOLUTIONS] = Query("day", description="Sum cases per day, week or month"),
+    max_points: Optional[int] = Query(None, ge=3, le=10000, description="Downsample each type to this many points")
 ):
     table_name = f"coronavirus_{year}"
     if table_name not in ALLOWED_TABLES:
         ErrorCode.INVALID_INPUT.raise_exception()
+    reject_patterns(table_name, country, type)
 
-    where_clauses = []
-    params = []
-
-    if country:
-        where_clauses.append("country ILIKE %s")
-        params.append(country)
-    if type:
-        where_clauses.append("type IN %s")
-        params.append(tuple(type))
-
-    where_sql = " AND ".join(where_clauses)
-    if where_sql:
-        where_sql = "WHERE " + where_sql
-
-    query = f"""
-        SELECT date, type, SUM(cases) AS cases
-        FROM public.{table_name}
-        {where_sql}
-        GROUP BY date, type
-        ORDER BY date;
-    """
-    data = fetch_and_cache_data(get_cache_key("plotly", table_name, country or "all", "_".join(sorted(type))), query, tuple(params))
-    df = pd.DataFrame(data)
+    types = "_".join(sorted(type))
+    version = data_version(table_name)
+
+    async def render():
+        query, params = rollup_query(table_name, country, type, resolution=resolution)
+        df = await fetch_and_cache_data(
+            get_cache_key("plotly", table_name, version, country or "all", types, resolution), query, params
+        )
+        df = downsample_frame(df, max_points, by="type")
+        return await run_in_threadpool(build_compare_types_figure, df, compare_types_title(year, country))
+
+    figure_json = await get_or_compute(
+        get_cache_key("plotly_figure", table_name, version, country or "all", types, resolution, str(max_points or "")),
+        render, ttl=redis_settings.CACHE_VERSIONED_TTL
+    )
+    if output == "json":
+        return Response(content=figure_json, media_type="application/json")
+    return HTMLResponse(plotly_page(figure_json, compare_types_title(year, country)))
+
+
+def compare_types_title(year: str, country: Optional[str]) -> str:
+    return f"COVID-19 Cases in {year}" + (f" ({country})" if country else "")
+
+
+def build_compare_types_figure(df: pd.DataFrame, title: str) -> bytes:
     if df.empty:
         raise HTTPException(status_code=404, detail="No data")
 
-    df["date"] = pd.to_datetime(df["date"])
     fig = go.Figure()
-
-    for t in df["type"].unique():
-        subset = df[df["type"] == t]
+    for t, subset in df.groupby("type", sort=False):
         fig.add_trace(go.Scatter(
-            x=subset["date"],
-            y=subset["cases"],
+            x=subset["date"].to_numpy(),
+            y=subset["cases"].to_numpy(),
             mode="lines+markers",
             name=t
         ))
 
-    title = f"COVID-19 Cases in {year}" + (f" ({country})" if country else "")
-    fig.update_layout(title=title, xaxis_title="Date", yaxis_title="Cases", hovermode="x unified")
-
-    return fig.to_html(full_html=True)
+    fig.update_layout(
+        title=title, xaxis_title="Date", yaxis_title="Cases", xaxis_type="date", hovermode="x unified"
+    )
+    return fig.to_json().encode("utf-8")
 
 @app.get("/plot/{table_name}/{column_name}")
+@http_cache(tables=lambda params: [params["table_name"]], max_age=300)
 @monitor
-def plot_data(table_name: str, column_name: str, country: Optional[str] = Query(None, description="Filter by country")):
+@warmable("plot")
+async def plot_data(
+    table_name: str,
+    column_name: str,
+    country: Optional[str] = Query(None, description="Filter by country"),
+    format: Literal["png", "svg", "webp"] = Query("png"),
+    resolution: Literal[RESOLUTIONS] = Query("day", description="Sum cases per day, week or month"),
+    max_points: Optional[int] = Query(None, ge=3, le=10000, description="Downsample the series to this many points")
+):
     if table_name not in ALLOWED_TABLES or column_name not in PLOT_COLUMNS:
         ErrorCode.INVALID_INPUT.raise_exception()
+    # Only case counts come from the rollups that can be summed per period.
+    if resolution != "day" and not (table_name.startswith("coronavirus_") and column_name == "cases"):
+        ErrorCode.INVALID_INPUT.raise_exception()
+    reject_patterns(table_name, country)
+    track(
+        "plot", table_name=table_name, column_name=column_name, country=country, format=format,
+        resolution=resolution, max_points=max_points
+    )
+
+    version = data_version(table_name)
+
+    async def render():
+        query, params = build_query(table_name, column_name, country, resolution)
+        df = await fetch_and_cache_data(
+            get_cache_key(table_name, version, column_name, country or "all", resolution), query, params
+        )
 
-    cache_key = get_cache_key(table_name, column_name, country or "all", "plot")
-    cached_plot = cache_get(cache_key)
-    if cached_plot:
-        logger.info(f"Cache hit for plot: {cache_key}")
-        return Response(content=cached_plot, media_type="image/png")
+        dates, values = plot_series(df["date"], df[column_name])
+        if not len(dates):
+            ErrorCode.NOT_FOUND.raise_exception()
+        dates, values = downsample_series(dates, values, max_points)
+        return await render_plot(dates, values, column_name, format)
 
-    logger.info(f"Cache miss for plot: {cache_key}")
-    query, params = build_query(table_name, column_name, country)
-    data = fetch_and_cache_data(cache_key, query, params)
+    cache_key = get_cache_key(
+        table_name, version, column_name, country or "all", "plot", format, resolution, str(max_points or "")
+    )
+    plot_image = await get_or_compute(cache_key, render, ttl=redis_settings.CACHE_VERSIONED_TTL)
+    return Response(content=plot_image, media_type=MEDIA_TYPES[format])
 
-    dates = [row["date"] for row in data if row.get("date") and row.get(column_name) is not None]
-    values = [row[column_name] for row in data if row.get("date") and row.get(column_name) is not None]
+class StaleStatsReply(Exception):
+    """The stats service answered for another data version than requested."""
 
-    plot_image = generate_plot(dates, values, column_name)
-    cache_set(cache_key, plot_image)
-    return Response(content=plot_image, media_type="image/png")
+    def __init__(self, body: bytes):
+        super().__init__("stats reply is for another data version")
+        self.body = body
 
-@app.get("/stats/cfr")
-@monitor
-async def get_cfr(country: Optional[str] = Query(None, description="Country name")):
+
+async def request_stats(subject: str, payload: dict):
     nc: NATS = app.state.nats
-    payload = {"country": country}
 
     try:
         msg = await nc.request(
-            "stats.calculate.cfr",
+            subject,
             json.dumps(payload).encode(),
             timeout=60
         )
     except TimeoutError:
-        logger.error(f"CFR request timed out for country={country}")
+        logger.error(f"Stats request on {subject} timed out for {payload}")
         ErrorCode.TIMEOUT.raise_exception()
     except NoRespondersError:
         logger.error("No stats service responders available")
@@ -296,13 +502,13 @@ async def get_cfr(country: Optional[str] = Query(None, description="Country name
             detail="Statistics service unavailable"
         )
     except Exception as e:
-        logger.error(f"Unexpected NATS error on CFR request: {e}")
+        logger.error(f"Unexpected NATS error on {subject} request: {e}")
         ErrorCode.SERVER_ERROR.raise_exception()
 
     try:
         data = json.loads(msg.data.decode())
     except (UnicodeDecodeError, json.JSONDecodeError) as e:
-        logger.error(f"Failed to decode CFR response: {e}")
+        logger.error(f"Failed to decode {subject} response: {e}")
         ErrorCode.BAD_GATEWAY.raise_exception()
 
     if isinstance(data, dict) and data.get("error_code"):
@@ -315,3 +521,31 @@ async def get_cfr(country: Optional[str] = Query(None, description="Country name
         )
 
     return data
+
+@app.get("/stats/cfr")
+@http_cache(tables=lambda params: ["coronavirus_daily"], max_age=60)
+@monitor
+@warmable("cfr")
+async def get_cfr(country: Optional[str] = Query(None, description="Country name")):
+    track("cfr", country=country)
+    version = data_version("coronavirus_daily")
+
+    async def compute():
+        reply = await request_stats("stats.calculate.cfr", {"country": country, "data_version": version})
+        body = json.dumps(reply).encode()
+        if reply.get("data_version") != version:
+            raise StaleStatsReply(body)
+        return body
+
+    cache_key = get_cache_key("cfr", version, country or "all")
+    try:
+        body = await get_or_compute(cache_key, compute, ttl=redis_settings.CACHE_VERSIONED_TTL)
+    except StaleStatsReply as e:
+        logger.warning(f"CFR index is not at data version {version}, not caching the reply")
+        body = e.body
+    return Response(content=body, media_type="application/json")
+
+@app.get("/stats/cfr/batch")
+@monitor
+async def get_cfr_batch(country: List[str] = Query(..., description="Country names")):
+    return await request_stats("stats.calculate.cfr.batch", {"countries": country})
@@ -0,0 +1,81 @@
+import threading
+
+from database.db_connect import query_db
+from database.models import CoronavirusDaily
+from database.rollups import COUNTRY_ROLLUP, GLOBAL_ROLLUP
+from database.versions import VERSION_QUERY, versions_from_manifest
+
+CFR_TYPES = ["confirmed", "death"]
+
+
+class CFRIndex:
+    """In-memory confirmed/death totals per country, built from the rollups.
+
+    ``version`` is the data version of coronavirus_daily, derived from the
+    manifest exactly as the API does, and is only None until the first
+    build; ``refresh`` only rebuilds the totals when it moved.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._countries = {}
+        self._global = (0, 0)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def current_version():
+        rows = query_db(VERSION_QUERY)
+        versions = versions_from_manifest((row["table_name"], row["path"], row["checksum"]) for row in rows)
+        return versions[CoronavirusDaily.__tablename__]
+
+    def refresh(self, force: bool = False) -> bool:
+        version = self.current_version()
+        if not force and self.version is not None and version == self.version:
+            return False
+
+        rows = query_db(
+            f"SELECT lower(country) AS country, type, SUM(cases) AS total "
+            f"FROM public.{COUNTRY_ROLLUP} "
+            f"WHERE type = ANY(%s) "
+            f"GROUP BY lower(country), type;",
+            (CFR_TYPES,)
+        )
+        countries = {}
+        for row in rows:
+            cases, deaths = countries.get(row["country"], (0, 0))
+            if row["type"] == "confirmed":
+                cases = int(row["total"] or 0)
+            else:
+                deaths = int(row["total"] or 0)
+            countries[row["country"]] = (cases, deaths)
+
+        totals = {
+            row["type"]: int(row["total"] or 0)
+            for row in query_db(
+                f"SELECT type, SUM(cases) AS total FROM public.{GLOBAL_ROLLUP} "
+                f"WHERE type = ANY(%s) GROUP BY type;",
+                (CFR_TYPES,)
+            )
+        }
+
+        with self._lock:
+            self._countries = countries
+            self._global = (totals.get("confirmed", 0), totals.get("death", 0))
+            self.version = version
+        return True
+
+    def lookup(self, country=None) -> dict:
+        with self._lock:
+            if country:
+                total_cases, total_deaths = self._countries.get(country.lower(), (0, 0))
+            else:
+                total_cases, total_deaths = self._global
+            version = self.version
+
+        return {
+            "data_version": version,
+            "country": country,
+            "total_cases": total_cases,
+            "total_deaths": total_deaths,
+            "cfr": (total_deaths / total_cases * 100) if total_cases else None,
+        }
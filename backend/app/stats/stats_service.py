@@ -1,13 +1,119 @@
 import asyncio
 import json
+import signal
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from fastapi import HTTPException
 from nats.aio.client import Client as NATS
+from prometheus_client import start_http_server
 from psycopg2 import DatabaseError
 
-from database.db_connect import query_db
+from database.db_connect import close_pool
 from common.config import logger
 from common.errors import ErrorCode
-from common.settings import settings
+from common.monitoring import STATS_REQUESTS, STATS_REQUEST_DURATION, STATS_IN_FLIGHT
+from common.settings import settings, stats_settings
+from database.versions import VERSION_SUBJECT_PREFIX
+from stats.cfr_index import CFRIndex
+
+REPLICA = socket.gethostname()
+
+
+class RequestError(Exception):
+    def __init__(self, error: ErrorCode):
+        super().__init__(error.message)
+        self.error = error
+
+
+async def respond_error(msg, err: ErrorCode):
+    await msg.respond(
+        json.dumps({
+            "error_code": err.code,
+            "error_message": err.message
+        }).encode()
+    )
+
+
+def decode_request(msg) -> dict:
+    try:
+        req = json.loads(msg.data.decode())
+    except (UnicodeDecodeError, ValueError) as e:
+        logger.error(f"Invalid payload: {e}")
+        raise RequestError(ErrorCode.INVALID_INPUT)
+    if not isinstance(req, dict):
+        logger.error("Invalid payload: not a JSON object")
+        raise RequestError(ErrorCode.INVALID_INPUT)
+    return req
+
+
+class Dispatcher:
+    """Runs subscription callbacks as tasks, at most ``max_in_flight`` at a time.
+
+    While the limit is reached the subscription callback blocks, so further
+    messages queue inside the NATS client up to its pending limit instead of
+    piling up as tasks. Blocking work goes to a bounded thread pool.
+    """
+
+    def __init__(self, max_in_flight: int, workers: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stats")
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tasks = set()
+
+    async def run_blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def bounded(self, handler):
+        async def callback(msg):
+            await self._slots.acquire()
+            task = asyncio.create_task(self._process(handler, msg))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return callback
+
+    async def _process(self, handler, msg):
+        STATS_IN_FLIGHT.labels(replica=REPLICA).inc()
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            await handler(msg)
+        except RequestError as e:
+            outcome = "error"
+            await respond_error(msg, e.error)
+        except Exception as e:
+            outcome = "error"
+            logger.error(f"Unhandled error on {msg.subject}: {e}")
+            await respond_error(msg, ErrorCode.SERVER_ERROR)
+        finally:
+            STATS_IN_FLIGHT.labels(replica=REPLICA).dec()
+            STATS_REQUESTS.labels(replica=REPLICA, subject=msg.subject, status=outcome).inc()
+            STATS_REQUEST_DURATION.labels(replica=REPLICA, subject=msg.subject).observe(
+                time.perf_counter() - start
+            )
+            self._slots.release()
+
+    async def drain(self, timeout: float):
+        if self._tasks:
+            logger.info(f"Waiting for {len(self._tasks)} in-flight stats requests")
+            _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+        self.executor.shutdown(wait=False)
+
+
+async def refresh_index(index: CFRIndex, dispatcher: Dispatcher, force: bool = False):
+    try:
+        if await dispatcher.run_blocking(index.refresh, force):
+            logger.info(f"CFR index loaded for data version {index.version}")
+    except (DatabaseError, HTTPException) as e:
+        logger.error(f"Failed to refresh CFR index: {e}")
+
+
+async def keep_index_fresh(index: CFRIndex, dispatcher: Dispatcher):
+    while True:
+        await asyncio.sleep(stats_settings.STATS_INDEX_REFRESH_INTERVAL)
+        await refresh_index(index, dispatcher)
 
 
 async def run():
@@ -19,58 +125,32 @@ async def run():
         logger.error(f"Unable to connect to NATS: {e}")
         return
 
-    async def handle_cfr(msg):
-        try:
-            payload = msg.data.decode()
-            req = json.loads(payload)
-            country = req.get("country")
-        except (UnicodeDecodeError, json.JSONDecodeError) as e:
-            logger.error(f"Invalid payload: {e}")
-            err = ErrorCode.INVALID_INPUT
-            await msg.respond(
-                json.dumps({
-                    "error_code": err.code,
-                    "error_message": err.message
-                }).encode()
-            )
-            return
+    if stats_settings.STATS_METRICS_PORT:
+        start_http_server(stats_settings.STATS_METRICS_PORT)
+        logger.info(f"Serving stats metrics on port {stats_settings.STATS_METRICS_PORT}")
 
-        def sum_for(record_type: str) -> int:
-            sql = (
-                "SELECT SUM(cases) AS total "
-                "FROM public.coronavirus_daily "
-                "WHERE type ILIKE %s"
-            )
-            params = [record_type]
-            if country:
-                sql += " AND country ILIKE %s"
-                params.append(country)
-            sql += ";"
-            rows = query_db(sql, tuple(params))
-            return rows[0]["total"] or 0
+    dispatcher = Dispatcher(stats_settings.STATS_MAX_IN_FLIGHT, stats_settings.STATS_WORKERS)
+    index = CFRIndex()
+    await refresh_index(index, dispatcher, force=True)
+    refresher = asyncio.create_task(keep_index_fresh(index, dispatcher))
 
-        try:
-            total_cases = sum_for("confirmed")
-            total_deaths = sum_for("death")
-        except DatabaseError as e:
-            logger.error(f"Database error: {e}")
-            err = ErrorCode.DATABASE_ERROR
-            await msg.respond(
-                json.dumps({
-                    "error_code": err.code,
-                    "error_message": err.message
-                }).encode()
-            )
-            return
+    def require_index():
+        if index.version is None:
+            raise RequestError(ErrorCode.DATABASE_ERROR)
 
-        cfr = (total_deaths / total_cases * 100) if total_cases else None
+    async def handle_cfr(msg):
+        req = decode_request(msg)
+        country = req.get("country")
+        if country is not None and not isinstance(country, str):
+            logger.error("Invalid CFR payload: country must be a string")
+            raise RequestError(ErrorCode.INVALID_INPUT)
+        # The API keys its cache by the data version it knows; catch up first
+        # if a version event has not reached this replica yet.
+        if req.get("data_version") not in (None, index.version):
+            await refresh_index(index, dispatcher)
+        require_index()
 
-        reply = {
-            "country": country,
-            "total_cases": total_cases,
-            "total_deaths": total_deaths,
-            "cfr": cfr,
-        }
+        reply = index.lookup(country)
 
         try:
             await msg.respond(json.dumps(reply).encode())
@@ -84,10 +164,63 @@ async def run():
         except Exception as e:
             logger.error(f"Broadcast failed: {e}")
 
-    await nc.subscribe("stats.calculate.cfr", cb=handle_cfr)
-    logger.info("Subscribed to subject stats.calculate.cfr")
+    async def handle_cfr_batch(msg):
+        countries = decode_request(msg).get("countries") or []
+        if not isinstance(countries, list) or not all(isinstance(country, str) for country in countries):
+            logger.error("Invalid batch payload: countries must be a list of strings")
+            raise RequestError(ErrorCode.INVALID_INPUT)
+        require_index()
 
-    await asyncio.Event().wait()
+        results = await dispatcher.run_blocking(lambda: [index.lookup(country) for country in countries])
+
+        try:
+            await msg.respond(json.dumps({"results": results}).encode())
+            logger.info(f"Replied to batch request for {len(countries)} countries")
+        except Exception as e:
+            logger.error(f"Failed to respond: {e}")
+
+    queue = stats_settings.STATS_QUEUE_GROUP
+    subscriptions = []
+    for subject, handler in (
+        ("stats.calculate.cfr", handle_cfr),
+        ("stats.calculate.cfr.batch", handle_cfr_batch),
+    ):
+        subscriptions.append(await nc.subscribe(
+            subject,
+            queue=queue,
+            cb=dispatcher.bounded(handler),
+            pending_msgs_limit=stats_settings.STATS_PENDING_MSGS_LIMIT,
+        ))
+        logger.info(f"Subscribed to subject {subject} in queue group {queue}")
+
+    async def on_data_version(msg):
+        # Every replica reloads, so this is not a queue-group subscription.
+        await refresh_index(index, dispatcher)
+
+    subscriptions.append(await nc.subscribe(
+        f"{VERSION_SUBJECT_PREFIX}.coronavirus_daily", cb=on_data_version
+    ))
+    logger.info(f"Subscribed to {VERSION_SUBJECT_PREFIX}.coronavirus_daily")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    await stop.wait()
+    logger.info("Shutting down stats service, draining NATS subscriptions")
+    refresher.cancel()
+    try:
+        for subscription in subscriptions:
+            await subscription.drain()
+        await dispatcher.drain(stats_settings.STATS_DRAIN_TIMEOUT)
+        await nc.drain()
+    except Exception as e:
+        logger.error(f"Error draining NATS: {e}")
+    logger.info("Stats service stopped")
 
 if __name__ == "__main__":
-    asyncio.run(run())
+    try:
+        asyncio.run(run())
+    finally:
+        close_pool()